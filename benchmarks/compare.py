@@ -0,0 +1,44 @@
+import argparse
+import json
+import sys
+
+# Compara dois relatórios de python -m benchmarks.run, etapa por etapa e tamanho por tamanho:
+#   python -m benchmarks.compare antes.json depois.json [--fail-above 1.2]
+
+def load(path):
+  with open(path) as f:
+    report = json.load(f)
+  return {result['rows']: result for result in report['results']}, report['meta']
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Compare two benchmark reports.')
+  parser.add_argument('before')
+  parser.add_argument('after')
+  parser.add_argument('--fail-above', type=float,
+                      help='exit with status 1 if any stage is slower than this ratio (after / before)')
+  args = parser.parse_args(argv)
+
+  before, before_meta = load(args.before)
+  after, after_meta = load(args.after)
+  print('before: {}  after: {}'.format(before_meta.get('commit'), after_meta.get('commit')))
+  print('{:>10}  {:<28} {:>10} {:>10} {:>7}'.format('rows', 'stage', 'before', 'after', 'ratio'))
+
+  regressions = []
+  for rows in sorted(set(before) & set(after)):
+    stages_before = before[rows]['stages']
+    stages_after = after[rows]['stages']
+    for stage in stages_before:
+      if stage not in stages_after or stage == 'generate':
+        continue
+      old, new = stages_before[stage]['seconds'], stages_after[stage]['seconds']
+      ratio = new / old if old else float('inf')
+      print('{:>10}  {:<28} {:>10.4f} {:>10.4f} {:>7.2f}'.format(rows, stage, old, new, ratio))
+      if args.fail_above is not None and ratio > args.fail_above:
+        regressions.append((rows, stage, ratio))
+
+  for rows, stage, ratio in regressions:
+    print('regression: {} rows, {} is {:.2f}x slower'.format(rows, stage, ratio), file=sys.stderr)
+  return 1 if regressions else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,92 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+# Custo de importação de cada página, para que uma dependência pesada carregada no topo de uma
+# página (matplotlib, por exemplo) não volte a atrasar o início de um processo novo:
+#   python -m benchmarks.imports [--budget-scale 2] [--json]
+# Os imports de cada página são executados num interpretador novo, depois do streamlit e do pandas,
+# que o servidor já carregou antes de executar qualquer página (o Streamlit 1.15 importa o pandas).
+# Termina com status 1 se alguma página passar do limite de tempo ou carregar um módulo proibido.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = ['Home.py', 'pages/view1countries.py', 'pages/view2cities.py', 'pages/view3cuisines.py']
+
+# Limite, em milissegundos, do tempo de importação de cada página. As bibliotecas de gráficos e
+# mapas são carregadas só quando usadas (utils/figures.py e utils/mapping.py), então os limites
+# cobrem apenas os módulos de utils/.
+BUDGET_MS = {
+  'Home.py': 50,
+  'pages/view1countries.py': 50,
+  'pages/view2cities.py': 50,
+  'pages/view3cuisines.py': 50,
+}
+
+# Módulos que nenhuma página deve carregar na importação: os que não são usados e os de gráficos e
+# mapas, que só são carregados ao montar a primeira figura.
+FORBIDDEN = ['matplotlib', 'PIL', 'plotly.express', 'folium', 'streamlit_folium']
+
+PROBE = """
+import json, sys, time
+import pandas, streamlit
+before = set(sys.modules)
+start = time.perf_counter()
+exec(compile(sys.argv[1], 'imports', 'exec'), {})
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'modules': sorted(set(sys.modules) - before)}))
+"""
+
+def page_imports(path):
+  # Os imports do nível superior da página, sem executar o restante do script.
+  with open(os.path.join(ROOT, path)) as f:
+    tree = ast.parse(f.read())
+  return '\n'.join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def measure(path, repeat):
+  # Menor tempo entre repeat execuções, cada uma num processo novo.
+  source = page_imports(path)
+  runs = []
+  for _ in range(repeat):
+    output = subprocess.run([sys.executable, '-c', PROBE, source], cwd=ROOT, capture_output=True, text=True,
+                            check=True).stdout
+    runs.append(json.loads(output.splitlines()[-1]))
+  best = min(runs, key=lambda run: run['seconds'])
+  return {'ms': round(best['seconds'] * 1000, 1), 'modules': best['modules']}
+
+def loaded(modules, names):
+  return [name for name in names if any(module == name or module.startswith(name + '.') for module in modules)]
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Check the import cost of every page.')
+  parser.add_argument('--budget-scale', type=float, default=1.0,
+                      help='multiply every budget by this factor (for slower machines)')
+  parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters per page; the fastest counts')
+  parser.add_argument('--json', action='store_true', help='print the results as JSON')
+  args = parser.parse_args(argv)
+
+  results, failures = {}, []
+  for page in PAGES:
+    result = measure(page, args.repeat)
+    result['budget_ms'] = BUDGET_MS[page] * args.budget_scale
+    result['forbidden'] = loaded(result['modules'], FORBIDDEN)
+    results[page] = result
+    if result['ms'] > result['budget_ms']:
+      failures.append('{} imports in {:.0f} ms (budget {:.0f} ms)'.format(page, result['ms'], result['budget_ms']))
+    if result['forbidden']:
+      failures.append('{} imports {}'.format(page, ', '.join(result['forbidden'])))
+
+  if args.json:
+    print(json.dumps({page: dict(result, modules=len(result['modules'])) for page, result in results.items()}, indent=2))
+  else:
+    print('{:<26} {:>8} {:>8} {:>8}'.format('page', 'ms', 'budget', 'modules'))
+    for page, result in results.items():
+      print('{:<26} {:>8.1f} {:>8.0f} {:>8}'.format(page, result['ms'], result['budget_ms'], len(result['modules'])))
+  for failure in failures:
+    print('regression: ' + failure, file=sys.stderr)
+  return 1 if failures else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
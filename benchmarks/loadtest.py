@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+# Teste de carga: várias sessões usam as quatro páginas ao mesmo tempo num servidor do Streamlit de
+# verdade (streamlit run), cada uma com a sua conexão websocket, como abas de navegador. Cada sessão
+# abre páginas ao acaso e muda a barra lateral (países, culinárias, quantidade de restaurantes,
+# culinárias listadas) antes de cada reexecução:
+#   python -m benchmarks.loadtest --sessions 10,50,100 --reruns 20 [--url http://host:8501] [--output report.json]
+# Sem --url, um servidor é iniciado numa porta livre e encerrado no fim. Para cada número de sessões,
+# mostra as latências das reexecuções (p50/p95/p99, do pedido de reexecução até o fim do script), a
+# vazão e a memória do servidor por sessão (crescimento do RSS dividido pelo número de sessões, com
+# todas ainda abertas; só com o servidor iniciado aqui, no Linux).
+# O cliente fala o protocolo do navegador (mensagens protobuf do pacote streamlit) pelo websockets,
+# instalado com o Streamlit novo, ou pelo tornado, usado pelo Streamlit 1.15.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.warmup import COUNTRIES
+
+PAGES = {
+  'home': 'Home.py',
+  'countries': 'pages/view1countries.py',
+  'cities': 'pages/view2cities.py',
+  'cuisines': 'pages/view3cuisines.py',
+}
+
+# Widgets da barra lateral (o contêiner 1 do delta_path; o 0 é o corpo da página).
+SIDEBAR = 1
+WIDGETS = ('multiselect', 'slider', 'checkbox')
+
+def free_port():
+  with socket.socket() as sock:
+    sock.bind(('127.0.0.1', 0))
+    return sock.getsockname()[1]
+
+def health_path(url):
+  # Caminho do websocket conforme a versão do servidor: /_stcore/stream nas novas, /stream na 1.15.
+  for health, stream in (('_stcore/health', '_stcore/stream'), ('healthz', 'stream')):
+    try:
+      with urllib.request.urlopen(url.rstrip('/') + '/' + health, timeout=2) as response:
+        if response.status == 200:
+          return stream
+    except OSError:
+      pass
+  return None
+
+def start_server(port, timeout):
+  command = [sys.executable, '-m', 'streamlit', 'run', PAGES['home'], '--server.headless', 'true',
+             '--server.port', str(port), '--server.address', '127.0.0.1', '--browser.gatherUsageStats', 'false']
+  process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+  url = 'http://127.0.0.1:{}'.format(port)
+  deadline = time.monotonic() + timeout
+  while time.monotonic() < deadline and process.poll() is None:
+    stream = health_path(url)
+    if stream is not None:
+      return process, url, stream
+    time.sleep(0.5)
+  process.kill()
+  raise RuntimeError('the Streamlit server did not start: {}'.format(' '.join(command)))
+
+def rss_bytes(pid):
+  # RSS atual do processo (Linux); None se não for possível ler.
+  try:
+    with open('/proc/{}/statm'.format(pid)) as f:
+      return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+  except (OSError, TypeError):
+    return None
+
+async def connect(url):
+  # Funções send, recv e close de uma conexão websocket.
+  try:
+    import websockets
+  except ImportError:
+    websockets = None
+  if websockets is not None:
+    ws = await websockets.connect(url, subprotocols=['streamlit'], max_size=None)
+    return ws.send, ws.recv, ws.close
+
+  from tornado.websocket import websocket_connect
+  ws = await websocket_connect(url, subprotocols=['streamlit'], max_message_size=1 << 30)
+
+  async def send(data):
+    await ws.write_message(data, binary=True)
+
+  async def recv():
+    message = await ws.read_message()
+    if message is None:
+      raise ConnectionError('connection closed by the server')
+    return message
+
+  async def close():
+    ws.close()
+  return send, recv, close
+
+class Session:
+  # Uma sessão do navegador: uma conexão e as reexecuções pedidas por ela, uma de cada vez. pages
+  # traz o hash de cada página de PAGES; app_pages recebe as páginas informadas pelo servidor.
+  def __init__(self, url, pages=None):
+    self.url = url
+    self.pages = pages or {}
+    self.app_pages = {}
+
+  async def open(self):
+    self.send, self.recv, self.close = await connect(self.url)
+
+  async def run(self, page_hash='', widgets=(), timeout=None):
+    # Pede uma reexecução da página com os valores dos widgets e espera o fim do script. Retorna a
+    # duração, os widgets da barra lateral, na ordem da página, e as exceções mostradas.
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    message = BackMsg()
+    message.rerun_script.query_string = ''
+    message.rerun_script.page_script_hash = page_hash
+    message.rerun_script.widget_states.widgets.extend(widgets)
+    start = time.perf_counter()
+    await self.send(message.SerializeToString())
+    elements, errors = [], []
+    while True:
+      forward = ForwardMsg()
+      forward.ParseFromString(await asyncio.wait_for(self.recv(), timeout))
+      kind = forward.WhichOneof('type')
+      if kind in ('new_session', 'navigation'):
+        for page in getattr(forward, kind).app_pages:
+          self.app_pages[page.page_name] = page.page_script_hash
+      elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+        element = forward.delta.new_element
+        name = element.WhichOneof('type')
+        if name == 'exception':
+          errors.append(element.exception.message.splitlines()[0] if element.exception.message else '')
+        elif name in WIDGETS and forward.metadata.delta_path[:1] == [SIDEBAR]:
+          elements.append((name, getattr(element, name)))
+      elif kind == 'script_finished':
+        return time.perf_counter() - start, elements, errors
+
+async def page_hashes(url, timeout):
+  # Hash de cada página de PAGES, pela lista de páginas que o servidor envia (o Streamlit nomeia cada
+  # página pelo nome do arquivo). A página principal também atende pelo hash vazio.
+  session = Session(url)
+  await session.open()
+  try:
+    await session.run(timeout=timeout)
+  finally:
+    await session.close()
+  names = {page_name.replace(' ', '_').lower(): script_hash for page_name, script_hash in session.app_pages.items()}
+  return {page: names.get(os.path.splitext(os.path.basename(path))[0].lower(), '') for page, path in PAGES.items()}
+
+def widget(elements, kind, number):
+  return [element for name, element in elements if name == kind][number]
+
+def widget_state(kind, element, value):
+  from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+  state = WidgetState(id=element.id)
+  if kind == 'multiselect':
+    # Até o Streamlit 1.4x, as posições das opções; depois (com raw_values no proto), os textos.
+    if 'raw_values' in element.DESCRIPTOR.fields_by_name:
+      state.string_array_value.data.extend(value)
+    else:
+      options = list(element.options)
+      state.int_array_value.data.extend(options.index(item) for item in value)
+  elif kind == 'slider':
+    state.double_array_value.data.append(value)
+  else:
+    state.bool_value = value
+  return state
+
+def sample(rng, options, low=1, high=None):
+  options = list(options)
+  if not options:
+    return []
+  return rng.sample(options, rng.randint(min(low, len(options)), min(high or len(options), len(options))))
+
+async def choose(rng, page, session, elements, timeout):
+  # Muda a barra lateral da página como um usuário faria: de 1 a 5 países e, na visão por
+  # culinária, a quantidade, a opção de culinárias listadas e de 1 a 6 culinárias disponíveis (as
+  # opções dependem dos países, então a página é reexecutada antes de escolhê-las).
+  states = [widget_state('multiselect', widget(elements, 'multiselect', 0), sample(rng, COUNTRIES, high=5))]
+  if page == 'cuisines':
+    states.append(widget_state('slider', widget(elements, 'slider', 0), rng.randint(3, 20)))
+    states.append(widget_state('checkbox', widget(elements, 'checkbox', 0), rng.random() < 0.3))
+    _, elements, _ = await session.run(session.pages[page], states, timeout)
+    cuisines = widget(elements, 'multiselect', 1)
+    states.append(widget_state('multiselect', cuisines, sample(rng, cuisines.options, high=6)))
+  return states
+
+async def run_session(number, args, url, pages):
+  # Reexecuções de uma sessão. A seleção de cada página é reenviada ao voltar a ela, como o navegador
+  # faria numa aba por página.
+  rng = random.Random(args.seed * 1_000_003 + number)
+  session = Session(url, pages)
+  await session.open()
+  visited, runs, errors = {}, [], []
+  for _ in range(args.reruns):
+    page = rng.choice(args.pages)
+    states = []
+    if page in visited:
+      elements, states = visited[page]
+      if rng.random() >= args.keep:
+        states = await choose(rng, page, session, elements, args.timeout)
+    seconds, elements, page_errors = await session.run(pages[page], states, args.timeout)
+    visited[page] = (elements, states)
+    runs.append((page, seconds))
+    errors.extend('{}: {}'.format(page, error) for error in page_errors)
+  return session, runs, errors
+
+def percentiles(seconds):
+  if not seconds:
+    return {}
+  values = np.percentile(seconds, [50, 95, 99]) * 1000
+  return {'p50_ms': round(values[0], 1), 'p95_ms': round(values[1], 1), 'p99_ms': round(values[2], 1),
+          'runs': len(seconds)}
+
+async def run_level(sessions, args, url, pages, pid):
+  before = rss_bytes(pid)
+  start = time.perf_counter()
+  results = await asyncio.gather(*(run_session(number, args, url, pages) for number in range(sessions)),
+                                 return_exceptions=True)
+  elapsed = time.perf_counter() - start
+  # As sessões (e o que o servidor guarda para elas) continuam abertas até aqui.
+  after = rss_bytes(pid)
+  failed = [result for result in results if isinstance(result, BaseException)]
+  results = [result for result in results if not isinstance(result, BaseException)]
+  for session, _, _ in results:
+    await session.close()
+
+  runs = [run for _, session_runs, _ in results for run in session_runs]
+  errors = [error for _, _, session_errors in results for error in session_errors]
+  errors.extend('session: {!r}'.format(error) for error in failed)
+  return {
+    'sessions': sessions,
+    'seconds': round(elapsed, 3),
+    'reruns_per_second': round(len(runs) / elapsed, 2),
+    'latency': percentiles([seconds for _, seconds in runs]),
+    'pages': {page: percentiles([seconds for name, seconds in runs if name == page]) for page in args.pages},
+    'rss_bytes': after,
+    'bytes_per_session': max(after - before, 0) // sessions if after is not None and before is not None else None,
+    'errors': len(errors),
+    'error_samples': sorted(set(errors))[:5],
+  }
+
+async def run_levels(args, url, pid):
+  stream = health_path(url)
+  if stream is None:
+    raise RuntimeError('no Streamlit server answering at {}'.format(url))
+  ws_url = url.replace('http', 'ws', 1).rstrip('/') + '/' + stream
+  pages = await page_hashes(ws_url, args.timeout)
+
+  # Uma primeira sessão passa por cada página, para que o servidor carregue os dados e os módulos
+  # fora das medições.
+  session, _, _ = await run_session(-1, argparse.Namespace(**dict(vars(args), reruns=len(args.pages) * 4, keep=1.0)),
+                                    ws_url, pages)
+  await session.close()
+
+  report = {'url': url, 'levels': []}
+  for sessions in (int(level) for level in args.sessions.split(',')):
+    level = await run_level(sessions, args, ws_url, pages, pid)
+    report['levels'].append(level)
+    print('{} sessions: p50 {} ms, p95 {} ms, p99 {} ms, {} reruns/s, {} MB/session, {} errors'.format(
+      sessions, level['latency'].get('p50_ms'), level['latency'].get('p95_ms'), level['latency'].get('p99_ms'),
+      level['reruns_per_second'],
+      round(level['bytes_per_session'] / 2**20, 1) if level['bytes_per_session'] is not None else '?',
+      level['errors']), file=sys.stderr)
+  return report
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Load-test the dashboard pages with concurrent browser sessions.')
+  parser.add_argument('--sessions', default='10', help='comma-separated numbers of concurrent sessions')
+  parser.add_argument('--reruns', type=int, default=20, help='reruns per session')
+  parser.add_argument('--pages', default=','.join(PAGES), help='comma-separated pages to visit')
+  parser.add_argument('--keep', type=float, default=0.2,
+                      help='probability that a rerun keeps the previous sidebar selection')
+  parser.add_argument('--seed', type=int, default=1)
+  parser.add_argument('--timeout', type=float, default=120, help='seconds allowed for one rerun')
+  parser.add_argument('--url', help='address of a running server (by default one is started on a free port)')
+  parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+  args = parser.parse_args(argv)
+  args.pages = args.pages.split(',')
+
+  process = None
+  if args.url:
+    url, pid = args.url, None
+  else:
+    process, url, _ = start_server(free_port(), args.timeout)
+    pid = process.pid
+  try:
+    report = asyncio.run(run_levels(args, url, pid))
+  finally:
+    if process is not None:
+      process.terminate()
+      process.wait()
+
+  text = json.dumps(report, indent=2)
+  if args.output:
+    with open(args.output, 'w') as f:
+      f.write(text + '\n')
+  else:
+    print(text)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Roda a partir da raiz do projeto: python -m benchmarks.run --sizes 10000,100000 --output report.json
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import write_synthetic
+from benchmarks.workloads import DEFAULT_COUNTRIES, VIEWS
+from utils import cache, loader
+from utils.aggregations import filter_countries
+from utils.cleaning import clear_data
+from utils.compact import compact
+from utils.cuisine_index import cuisine_index
+from utils.geo import geo_index
+from utils.partials import country_partials
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+def measure(stages, name, func, trace_memory):
+  # Mede o tempo (e, com --trace-memory, o pico de memória alocada) de uma etapa.
+  if trace_memory:
+    tracemalloc.reset_peak()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+  start = time.perf_counter()
+  result = func()
+  stages[name] = {'seconds': round(time.perf_counter() - start, 6)}
+  if trace_memory:
+    stages[name]['peak_bytes'] = tracemalloc.get_traced_memory()[1] - start_bytes
+  return result
+
+def max_rss_bytes():
+  # ru_maxrss é em KB no Linux e em bytes no macOS.
+  rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return rss if sys.platform == 'darwin' else rss * 1024
+
+def run_size(rows, source, trace_memory, workdir):
+  stages = {}
+  path = os.path.join(workdir, 'zomato.csv')
+  measure(stages, 'generate', lambda: write_synthetic(path, rows, source), False)
+
+  # Etapas isoladas do carregamento.
+  raw = measure(stages, 'read_csv', lambda: pd.read_csv(path), trace_memory)
+  df1 = measure(stages, 'clean', lambda: clear_data(raw), trace_memory)
+  del raw
+  measure(stages, 'compact', lambda: compact(df1), trace_memory)
+  del df1
+
+  # O caminho completo das páginas, a partir do diretório com a base sintética.
+  previous = os.getcwd()
+  os.chdir(workdir)
+  try:
+    loader.reset()
+    cache.clear()
+    df1 = measure(stages, 'load_data', lambda: loader.load_data(), trace_memory)
+    measure(stages, 'build.partials', country_partials, trace_memory)
+    measure(stages, 'build.cuisine_index', cuisine_index, trace_memory)
+    measure(stages, 'build.geo_index', geo_index, trace_memory)
+    measure(stages, 'filter', lambda: filter_countries(df1, DEFAULT_COUNTRIES), trace_memory)
+
+    map_html = ''
+    for name, view in VIEWS.items():
+      cache.clear()
+      result = measure(stages, 'view.{}.cold'.format(name), view, trace_memory)
+      measure(stages, 'view.{}.warm'.format(name), view, trace_memory)
+      if name == 'home':
+        map_html = result
+  finally:
+    os.chdir(previous)
+    loader.reset()
+    cache.clear()
+
+  return {'rows': rows, 'stages': stages, 'map_html_bytes': len(map_html), 'max_rss_bytes': max_rss_bytes()}
+
+def metadata():
+  try:
+    commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+  except OSError:
+    commit = None
+  return {
+    'commit': commit or None,
+    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    'python': platform.python_version(),
+    'pandas': pd.__version__,
+    'numpy': np.__version__,
+    'machine': platform.machine(),
+    'cpus': os.cpu_count(),
+  }
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark the data pipeline and the dashboard views.')
+  parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                      help='comma-separated row counts of the synthetic datasets')
+  parser.add_argument('--source', default=os.path.join(ROOT, 'zomato.csv'),
+                      help='CSV whose rows are resampled into the synthetic datasets')
+  parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+  parser.add_argument('--trace-memory', action='store_true',
+                      help='record peak allocated memory per stage (slower)')
+  args = parser.parse_args(argv)
+
+  if args.trace_memory:
+    tracemalloc.start()
+  report = {'meta': metadata(), 'results': []}
+  for rows in (int(size) for size in args.sizes.split(',')):
+    with tempfile.TemporaryDirectory() as workdir:
+      result = run_size(rows, os.path.abspath(args.source), args.trace_memory, workdir)
+    report['results'].append(result)
+    print('{} rows: {:.2f}s'.format(rows, sum(stage['seconds'] for stage in result['stages'].values())),
+          file=sys.stderr)
+
+  text = json.dumps(report, indent=2)
+  if args.output:
+    with open(args.output, 'w') as f:
+      f.write(text + '\n')
+  else:
+    print(text)
+
+if __name__ == '__main__':
+  main()
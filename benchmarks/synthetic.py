@@ -0,0 +1,32 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Gera bases sintéticas com o mesmo esquema do zomato.csv, reamostrando as linhas reais: cada linha
+# nova recebe um Restaurant ID único (para não ser removida como duplicada) e coordenadas e votos
+# levemente alterados. A escrita é feita em blocos, então o tamanho gerado não depende da memória.
+CHUNK_ROWS = 500_000
+
+def synthetic_chunks(rows, source='zomato.csv', seed=0, chunk_rows=CHUNK_ROWS):
+  base = pd.read_csv(source)
+  rng = np.random.default_rng(seed)
+  first_id = int(base['Restaurant ID'].max()) + 1
+  for start in range(0, rows, chunk_rows):
+    size = min(chunk_rows, rows - start)
+    chunk = base.iloc[rng.integers(0, len(base), size)].reset_index(drop=True)
+    chunk['Restaurant ID'] = np.arange(first_id + start, first_id + start + size)
+    chunk['Latitude'] = chunk['Latitude'] + rng.normal(0, 0.01, size)
+    chunk['Longitude'] = chunk['Longitude'] + rng.normal(0, 0.01, size)
+    chunk['Votes'] = rng.integers(0, 2 * int(base['Votes'].mean()), size)
+    yield chunk
+
+def write_synthetic(path, rows, source='zomato.csv', seed=0):
+  # Grava um CSV sintético com rows linhas em path.
+  for i, chunk in enumerate(synthetic_chunks(rows, source, seed)):
+    chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+  return path
+
+if __name__ == '__main__':
+  # Uso: python -m benchmarks.synthetic <linhas> <saida.csv>
+  print(write_synthetic(sys.argv[2], int(sys.argv[1])))
@@ -0,0 +1,43 @@
+from utils.aggregations import (aggregate, best_cuisines, best_restaurants, cities_by_country, cuisine_options,
+                                home_metrics, price_by_country, restaurants_by_country, top_cities,
+                                top_cities_cuisines, top_cities_over_4, top_cities_under_2_5, votes_by_country,
+                                worst_cuisines)
+from utils.figures import chart, map_figure, map_html
+from utils.loader import load_data
+from utils.warmup import (CITY_COLUMNS, COUNTRY_COLUMNS, CUISINE_COLUMNS, DEFAULT_COUNTRIES, DEFAULT_CUISINES,
+                          HOME_COLUMNS, HOME_COUNTRIES)
+
+# O trabalho de dados que cada página faz a cada execução, sem o Streamlit: as mesmas colunas, as
+# mesmas chamadas e as seleções padrão da barra lateral (utils/warmup.py). Deve acompanhar as páginas.
+
+def home(countries=HOME_COUNTRIES):
+  # Retorna o HTML do mapa, que é o que a página envia ao navegador.
+  df1 = load_data(columns=HOME_COLUMNS)
+  aggregate(home_metrics, df1, countries=countries)
+  return map_html(map_figure(df1, countries)[0])
+
+def countries_view(countries=DEFAULT_COUNTRIES):
+  df1 = load_data(columns=COUNTRY_COLUMNS)
+  return [chart(func, df1, countries=countries)
+          for func in (restaurants_by_country, cities_by_country, votes_by_country, price_by_country)]
+
+def cities_view(countries=DEFAULT_COUNTRIES):
+  df1 = load_data(columns=CITY_COLUMNS)
+  return [chart(func, df1, countries=countries, top=10)
+          for func in (top_cities, top_cities_over_4, top_cities_under_2_5, top_cities_cuisines)]
+
+def cuisines_view(countries=DEFAULT_COUNTRIES, cuisines=DEFAULT_CUISINES, top=10, listed=False):
+  df1 = load_data(columns=CUISINE_COLUMNS)
+  options = aggregate(cuisine_options, df1, countries=countries, listed=listed)
+  cuisines = [cuisine for cuisine in cuisines if cuisine in options]
+  results = [aggregate(best_restaurants, df1, countries=countries, cuisines=cuisines, listed=listed, top=5),
+             aggregate(best_restaurants, df1, countries=countries, cuisines=cuisines, listed=listed, top=top)]
+  return results + [chart(func, df1, countries=countries, cuisines=cuisines, listed=listed, top=10)
+                    for func in (best_cuisines, worst_cuisines)]
+
+VIEWS = {
+  'home': home,
+  'countries': countries_view,
+  'cities': cities_view,
+  'cuisines': cuisines_view,
+}
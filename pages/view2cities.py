@@ -1,111 +1,36 @@
-import folium as fo
-from streamlit_folium import folium_static
-import pandas as pd
-import matplotlib.pyplot as plt
-from PIL import Image
-import plotly.express as px
 import streamlit as st
 
-countries = {
-1: "India",
-14: "Australia",
-30: "Brazil",
-37: "Canada",
-94: "Indonesia",
-148: "New Zeland",
-162: "Philippines",
-166: "Qatar",
-184: "Singapure",
-189: "South Africa",
-191: "Sri Lanka",
-208: "Turkey",
-214: "United Arab Emirates",
-215: "England",
-216: "United States of America",
-}
+from utils.api import serve
+from utils.aggregations import top_cities, top_cities_cuisines, top_cities_over_4, top_cities_under_2_5
+from utils.loader import load_data, pin
+from utils.metrics import begin_run, end_run, span
+from utils.payload import plotly_chart
+from utils.refresh import watch
+from utils.warmup import CITY_COLUMNS, COUNTRIES, DEFAULT_COUNTRIES, record, start
 
-def country_name(country_id):
-    return countries[country_id]
-
-def get_price_range_description(price_range):
-    if price_range == 1:
-        return "cheap"
-    elif price_range == 2:
-        return "normal"
-    elif price_range == 3:
-        return "expensive"
-    else:
-        return "gourmet"
-
-def convert_to_dollar(currency, price):
-    if currency == 'Botswana Pula(P)':
-        return price*0.076
-    elif currency == 'Brazilian Real(R$)':
-        return price*0.19
-    elif currency == 'Dollar($)':
-        return price*1
-    elif currency == 'Emirati Diram(AED)':
-        return price*0.27
-    elif currency == 'Indian Rupees(Rs.)':
-        return price*0.012
-    elif currency == 'Indonesian Rupiah(IDR)':
-        return price*0.000066
-    elif currency == 'NewZealand($)':
-        return price*0.623515
-    elif currency == 'Pounds(£)':
-        return price*1.24
-    elif currency == 'Qatari Rial(QR)':
-        return price*0.27
-    elif currency == 'Rand(R)':
-        return price*0.056
-    elif currency == 'Sri Lankan Rupee(LKR)':
-        return price*0.0031
-    elif currency == 'Turkish Lira(TL)':
-        return price*0.0052
-    else:
-        return price
-
-def clear_data(df):
-  # Limpeza
-  # Remove itens duplicados
-  df1 = df.drop_duplicates()
-
-  # Reseta index para não criar o problema de itens "pulados" pelo filtro.
-  # O inplace=True serve para executar as alterações no próprio dataframe (e não como retorno), e
-  # o drop=True serve para ele não gerar uma nova coluna de index.
-  df1.reset_index(inplace=True, drop=True)
-
-  # Disable chained assignments, evita o warning de cópia sobre uma parte do dataframe.
-  pd.options.mode.chained_assignment = None
-
-  # A coluna do dataframe possui várias informações separadas por vírgulas. Essa função remove as
-  # demais e atribui apenas o primeiro valor.
-  # Possível utilização também da função assign:
-  # df = df.assign(my_col=lambda d: d['my_col'].astype(int))
-  df1['Cuisines'] = df1.loc[:, 'Cuisines'].apply(lambda x: str(x).split(',')[0])
+st.set_page_config(page_title='City View',
+                   layout='wide',
+                   initial_sidebar_state='expanded',
+                   page_icon=':cityscape:')
 
-  # Cria a coluna com o nome do país baseado na função definida acima.
-  df1['Country Name'] = df1.loc[:, 'Country Code'].apply(lambda x: country_name(x))
+# Instrumentação (desligada por padrão, ver utils/metrics.py)
+begin_run('City View')
 
-  # Cria a coluna com a descrição da faixa de preço baseado na função definida acima.
-  df1['Price Range Description'] = df1.loc[:, 'Price range'].apply(lambda x: get_price_range_description(x))
+# Pré-aquecimento das seleções padrão e populares (uma vez por processo, ver utils/warmup.py)
+start()
 
-  # Acertando um valor errado em um restaurante na Austrália.
-  df1.loc[(df1['Country Name']=='Australia') & (df1['Average Cost for two']==25000017.0), 'Average Cost for two']=250
+# Atualização dos dados em segundo plano (uma vez por processo, ver utils/refresh.py)
+watch()
 
-  # Cria a coluna com o preço em dólar baseado na função definida acima.
-  df1['Price in Dollar for two'] = df1.loc[:, ['Currency', 'Average Cost for two']].apply(lambda x: convert_to_dollar(x['Currency'], x['Average Cost for two']), axis=1)
-  
-  return df1
+# API de consultas, só com RESTAURANTS_API_PORT definido (ver utils/api.py)
+serve()
 
-st.set_page_config(page_title='City View',
-                   layout='wide',
-                   initial_sidebar_state='expanded',
-                   page_icon=':cityscape:')
+# Uma única versão dos dados em toda a execução (ver utils/loader.py)
+pin()
 
 # Lendo o arquivo e limpando o data frame
-df = pd.read_csv('zomato.csv')
-df1 = clear_data(df)
+with span('load_data'):
+  df1 = load_data(columns=CITY_COLUMNS)
 
 # Streamlit
 # Barra lateral
@@ -116,11 +41,8 @@ df1 = clear_data(df)
 
 st.sidebar.markdown('## Filter')
 countryList = st.sidebar.multiselect('Which countries do you want to view?',
-                                      ['Australia', 'Brazil', 'Canada', 'England', 'India', 'Indonesia', 'New Zeland',
-                                       'Philippines', 'Qatar', 'Singapure', 'South Africa', 'Sri Lanka', 'Turkey',
-                                       'United Arab Emirates', 'United States of America'],
-                                      default=['Brazil', 'England', 'India', 'Turkey', 'United States of America'])
-df1 = df1.loc[df1['Country Name'].isin(countryList), :]
+                                      COUNTRIES, default=DEFAULT_COUNTRIES)
+record('cities', countries=countryList)
 
 st.sidebar.markdown("""---""")
 st.sidebar.markdown('#### Powered by FNunes')
@@ -130,33 +52,27 @@ st.header(':cityscape: City View')
 # https://streamlit-emoji-shortcodes-streamlit-app-gwckff.streamlit.app/
 with st.container():
   # Top 10 cidades com mais restaurantes na base de dados.
-  dfCity = df1.loc[:, ['Country Name', 'City', 'Restaurant ID']].groupby(['Country Name', 'City']).count()
-  dfCity = dfCity.sort_values('Restaurant ID', ascending=False).reset_index()
-  dfCity.rename(columns = {'Country Name': 'Country', 'Restaurant ID': 'Qty of Restaurants'}, inplace=True)
-  st.plotly_chart(px.bar(dfCity.head(10), x='City', y='Qty of Restaurants', color='Country', title='Qty of Restaurants by Country'), use_container_width=True)
+  with span('chart.Qty of Restaurants by Country'):
+    plotly_chart(top_cities, df1, countries=countryList, top=10)
 
 with st.container():
   col1, col2 = st.columns(2)
   with col1:
     # Gráfico de barras com a quantidade de restaurantes com avaliação acima de 4 por cidade,
     # com cores diferentes para cada país.
-    dfCity = df1.loc[df1['Aggregate rating']>=4, ['Country Name', 'City', 'Restaurant ID']].groupby(['Country Name', 'City']).count()
-    dfCity = dfCity.sort_values('Restaurant ID', ascending=False).reset_index()
-    dfCity.rename(columns = {'Country Name': 'Country', 'Restaurant ID': 'Qty of Restaurants'}, inplace=True)
-    st.plotly_chart(px.bar(dfCity.head(10), x='City', y='Qty of Restaurants', color='Country', title='Qty of Restaurants over 4.0'), use_container_width=True)
+    with span('chart.Qty of Restaurants over 4.0'):
+      plotly_chart(top_cities_over_4, df1, countries=countryList, top=10)
 
   with col2:
     # Gráfico de barras com a quantidade de restaurantes com avaliação abaixo de 2.5 por cidade,
     # com cores diferentes para cada país.
-    dfCity = df1.loc[df1['Aggregate rating']<2.5, ['Country Name', 'City', 'Restaurant ID']].groupby(['Country Name', 'City']).count()
-    dfCity = dfCity.sort_values('Restaurant ID', ascending=True).reset_index()
-    dfCity.rename(columns = {'Country Name': 'Country', 'Restaurant ID': 'Qty of Restaurants'}, inplace=True)
-    st.plotly_chart(px.bar(dfCity.head(10), x='City', y='Qty of Restaurants', color='Country', title='Qty of Restaurants under 2.5'), use_container_width=True)
+    with span('chart.Qty of Restaurants under 2.5'):
+      plotly_chart(top_cities_under_2_5, df1, countries=countryList, top=10)
   
 with st.container():
     # Gráfico de barras com as top 10 cidades com mais tipos de culinária diferentes, com
     # cores diferentes para cada país.
-    dfCity = df1.loc[:, ['Country Name', 'City', 'Cuisines']].drop_duplicates().groupby(['Country Name', 'City']).count()
-    dfCity = dfCity.sort_values('Cuisines', ascending=False).reset_index()
-    dfCity.rename(columns = {'Country Name': 'Country', 'Cuisines': 'Qty of Cuisines'}, inplace=True)
-    st.plotly_chart(px.bar(dfCity.head(10), x='City', y='Qty of Cuisines', color='Country', title='Qty of Cuisines'), use_container_width=True)
\ No newline at end of file
+    with span('chart.Qty of Cuisines'):
+      plotly_chart(top_cities_cuisines, df1, countries=countryList, top=10)
+
+end_run()
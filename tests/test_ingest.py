@@ -0,0 +1,131 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import cache, loader
+from utils.cleaning import clear_data
+from utils.compact import compact
+from utils.cuisine_index import INDEX_COLUMNS, build_index, cuisine_index
+from utils.ingest import KEY, apply_delta, delta_dir, merge_changes
+from utils.markers import MARKER_COLUMNS, build_markers, map_markers
+from utils.partials import PARTIAL_COLUMNS, build_partials, country_partials
+from utils.rollup import ROLLUP_COLUMNS, build_rollup, city_rollup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope='module')
+def base():
+  # Sem as linhas repetidas, as posições do CSV são as mesmas do data frame limpo.
+  return pd.read_csv(os.path.join(ROOT, 'zomato.csv')).drop_duplicates().reset_index(drop=True)
+
+@pytest.fixture
+def work(tmp_path, monkeypatch, base):
+  monkeypatch.chdir(tmp_path)
+  base.to_csv('zomato.csv', index=False)
+  loader.reset()
+  cache.clear()
+  yield tmp_path
+  loader.reset()
+  cache.clear()
+
+def changes(base):
+  # Dois deltas: o primeiro altera notas e votos (um restaurante muda de país), acrescenta
+  # restaurantes (um numa cidade nova) e repete linhas idênticas; o segundo volta a alterar um
+  # restaurante novo e um existente.
+  updated = base.sample(40, random_state=1).copy()
+  updated['Aggregate rating'] = np.resize([1.5, 2.2, 4.4, 4.9], 40)
+  updated['Votes'] = updated['Votes'] + 7
+  updated.iloc[0, updated.columns.get_loc('Country Code')] = 30
+  new = base.sample(30, random_state=2).copy()
+  new[KEY] = np.arange(10**8, 10**8 + 30)
+  new.iloc[0, new.columns.get_loc('City')] = 'Nova Cidade'
+  same = base.sample(10, random_state=3)
+  first = pd.concat([updated, new, same])
+  second = pd.concat([new.iloc[[5]], updated.iloc[[3]]])
+  second['Votes'] = second['Votes'] + 1
+  return [first, second]
+
+def merged(base, deltas):
+  # O CSV que teria as mudanças dos deltas desde o início: cada linha alterada na mesma posição e os
+  # restaurantes novos no fim, na ordem em que chegaram.
+  df = base.set_index(KEY)
+  for delta in deltas:
+    delta = delta.set_index(KEY)
+    existing = delta.index.isin(df.index)
+    df.loc[delta.index[existing]] = delta.loc[existing, df.columns]
+    df = pd.concat([df, delta.loc[~existing, df.columns]])
+  return df.reset_index().loc[:, base.columns]
+
+def same_frame(df, expected):
+  # Mesmos valores, ignorando os tipos da compactação (categorias, inteiros menores).
+  expected = expected.loc[:, df.columns]
+  return (df.astype(object).where(df.notna(), None)
+          .equals(expected.astype(object).where(expected.notna(), None)))
+
+def test_apply_delta_matches_clear_data(base):
+  deltas = changes(base)
+  df1, _ = compact(clear_data(base.copy()))
+  applied = []
+  for delta in deltas:
+    df1, change = apply_delta(df1, clear_data(delta.copy()))
+    applied.append(change)
+  change = merge_changes(applied)
+  assert (change['appended'], change['updated'], change['unchanged']) == (30, 42, 10)
+  assert same_frame(df1, clear_data(merged(base, deltas)))
+
+def write_delta(name, delta):
+  os.makedirs(delta_dir('zomato.csv'), exist_ok=True)
+  delta.to_csv(os.path.join(delta_dir('zomato.csv'), name), index=False)
+  # A listagem dos deltas é refeita quando o mtime da pasta muda.
+  time.sleep(0.01)
+
+def structures():
+  return country_partials(), city_rollup(), map_markers(), cuisine_index()
+
+def assert_same_structures(incremental, full):
+  partials, rollup, markers, index = incremental
+  full_partials, full_rollup, full_markers, full_index = full
+  assert partials.astype(object).equals(full_partials.astype(object))
+  assert rollup.equals(full_rollup)
+  assert markers['text'] == full_markers['text']
+  assert np.array_equal(markers['offsets'], full_markers['offsets'])
+  assert index['rows'] == full_index['rows']
+  for table in ('country', 'first', 'listed'):
+    assert set(index[table]) == set(full_index[table])
+    for key, rows in full_index[table].items():
+      assert np.array_equal(index[table][key], rows)
+
+def test_incremental_update(work, base):
+  # Os deltas chegam com as estruturas derivadas já construídas: elas são atualizadas pelos hooks de
+  # update do derived() e devem ficar iguais às construídas do zero sobre o CSV com as mudanças.
+  deltas = changes(base)
+  loader.load_data()
+  structures()
+  for number, delta in enumerate(deltas):
+    write_delta('{:03}.csv'.format(number), delta)
+  df1 = loader.load_data()
+  assert loader.generation()['changes']['zomato.csv']['previous'] is not None
+  incremental = structures()
+  assert same_frame(df1, clear_data(merged(base, deltas)))
+
+  merged(base, deltas).to_csv('zomato.csv', index=False)
+  os.rename(delta_dir('zomato.csv'), 'applied')
+  loader.reset()
+  full = (build_partials(loader.load_data(columns=PARTIAL_COLUMNS)),
+          build_rollup(loader.load_data(columns=ROLLUP_COLUMNS)),
+          build_markers(loader.load_data(columns=MARKER_COLUMNS)),
+          build_index(loader.load_data(columns=INDEX_COLUMNS)))
+  assert_same_structures(incremental, full)
+
+def test_header_only_delta(work, base):
+  df1 = loader.load_data()
+  before = structures()
+  write_delta('000.csv', base.head(0))
+  after = loader.load_data()
+  change = loader.generation()['changes']['zomato.csv']
+  assert (len(change['rows']), change['appended'], change['updated']) == (0, 0, 0)
+  assert after.equals(df1)
+  assert_same_structures(structures(), before)
@@ -0,0 +1,31 @@
+import os
+import threading
+
+from utils import metrics
+
+def test_concurrent_prometheus_export(tmp_path):
+  path = str(tmp_path / 'restaurants.prom')
+  metrics.count('test_writes_total')
+  errors = []
+
+  def export():
+    for _ in range(100):
+      try:
+        metrics.write_prometheus(path)
+      except Exception as error:
+        errors.append(error)
+
+  threads = [threading.Thread(target=export) for _ in range(8)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert errors == []
+  assert os.listdir(tmp_path) == ['restaurants.prom']
+
+def test_export_error_does_not_fail_the_run(tmp_path, monkeypatch):
+  monkeypatch.setattr(metrics, 'ENABLED', True)
+  monkeypatch.setattr(metrics, 'TEXTFILE', str(tmp_path / 'missing' / 'restaurants.prom'))
+  monkeypatch.setattr(metrics, 'render_panel', lambda run: None)
+  metrics.begin_run('Test')
+  assert metrics.end_run()['page'] == 'Test'
@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils import parallel
+from utils.cleaning import clear_data
+from utils.compact import compact
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope='module')
+def zomato():
+  # O CSV original, com as linhas repetidas que o drop_duplicates remove.
+  return pd.read_csv(os.path.join(ROOT, 'zomato.csv'))
+
+@pytest.fixture
+def pool(monkeypatch):
+  # Poucos processos e nenhum tamanho mínimo: a base de teste é dividida em partes pequenas, e a
+  # Índia, maior que a parte de cada processo, é dividida pelo Restaurant ID.
+  monkeypatch.setattr(parallel, 'WORKERS', 3)
+  monkeypatch.setattr(parallel, 'MIN_ROWS', 0)
+
+def assert_same(df, drop_unused=True):
+  expected, expected_report = compact(clear_data(df.copy()), drop_unused=drop_unused)
+  result, report = parallel.parallel_clean(df, drop_unused=drop_unused)
+  pd.testing.assert_frame_equal(result, expected)
+  assert list(result.dtypes) == list(expected.dtypes)
+  assert report['rows'] == expected_report['rows']
+
+@pytest.mark.parametrize('drop_unused', [True, False])
+def test_fork(pool, zomato, drop_unused):
+  assert parallel.enabled(zomato)
+  assert_same(zomato, drop_unused)
+
+def test_forkserver(pool, zomato, monkeypatch):
+  # Com outras threads rodando (o servidor do Streamlit), as partes vão serializadas a um forkserver.
+  monkeypatch.setattr(parallel, 'can_fork', lambda: False)
+  assert_same(zomato)
+
+def test_shuffled(pool, zomato):
+  # Linhas fora de ordem e repetições espalhadas: a ordem das linhas deve ser a da execução serial.
+  df = pd.concat([zomato, zomato.sample(300, random_state=1)]).sample(frac=1, random_state=2)
+  assert_same(df)
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.cleaning import clear_data
+from utils.compact import compact
+from utils.ranking import top_k
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope='module')
+def zomato():
+  # Base limpa e compactada, como a que as páginas recebem (notas em float32, muitas empatadas).
+  return compact(clear_data(pd.read_csv(os.path.join(ROOT, 'zomato.csv'))))[0]
+
+def expected(df, k, score='Aggregate rating', tie='Restaurant ID'):
+  # A referência: ordenar a base inteira. O índice de top_k é a posição de cada linha em df.
+  return df.reset_index(drop=True).sort_values([score, tie], ascending=[False, True]).head(k)
+
+def assert_same(df, k, **columns):
+  pd.testing.assert_frame_equal(top_k(df, k, **columns), expected(df, k, **columns))
+
+@pytest.mark.parametrize('k', [0, 1, 10, 100, 1000])
+def test_zomato(zomato, k):
+  assert_same(zomato, k)
+
+def test_zomato_country(zomato):
+  # Um recorte filtrado, com índice fora de ordem, como em aggregations.top_restaurants.
+  assert_same(zomato.loc[zomato['Country Name'] == 'India'].iloc[::-1], 25)
+
+def test_ties():
+  # k corta no meio de um grupo de notas iguais, que são desempatadas pelo ID; IDs repetidos ficam
+  # na ordem original.
+  df = pd.DataFrame({'Aggregate rating': [4.5, 3.0, 4.5, 4.5, 4.9, 3.0, 4.5, 4.5],
+                     'Restaurant ID': [7, 1, 3, 3, 9, 2, 5, 1]})
+  for k in range(len(df) + 1):
+    assert_same(df, k)
+
+def test_missing_scores():
+  # Notas vazias ficam no fim, também ordenadas pelo ID.
+  df = pd.DataFrame({'Aggregate rating': [np.nan, 4.0, np.nan, 2.5, 4.0, np.nan],
+                     'Restaurant ID': [6, 5, 1, 4, 2, 3]})
+  for k in range(len(df) + 2):
+    assert_same(df, k)
+
+@pytest.mark.parametrize('k', [5, 6, 50])
+def test_k_at_least_len(k):
+  df = pd.DataFrame({'Aggregate rating': [3.5, 4.2, 3.5, 1.0, 4.2], 'Restaurant ID': [2, 9, 1, 4, 3]})
+  result = top_k(df, k)
+  assert len(result) == len(df)
+  assert_same(df, k)
+
+@pytest.mark.parametrize('k', [0, 3])
+def test_empty(zomato, k):
+  df = zomato.head(0)
+  assert len(top_k(df, k)) == 0
+  assert_same(df, k)
+
+def test_random():
+  rng = np.random.default_rng(1)
+  for _ in range(50):
+    n = int(rng.integers(0, 200))
+    scores = rng.choice([1.0, 2.5, 3.7, 4.1, 4.9, np.nan], n)
+    df = pd.DataFrame({'Aggregate rating': scores, 'Restaurant ID': rng.integers(0, 50, n),
+                       'Name': rng.integers(0, 10**6, n)})
+    assert_same(df, int(rng.integers(0, n + 5)))
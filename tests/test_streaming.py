@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from utils.snapshot import build_snapshot, read_snapshot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope='module')
+def zomato():
+  return pd.read_csv(os.path.join(ROOT, 'zomato.csv'))
+
+def assert_same(tmp_path, df, chunk_sizes, drop_unused=True):
+  # O snapshot em blocos, com as linhas repetidas descartadas pelas impressões digitais, deve ser
+  # igual ao lido de uma vez (mesmas linhas, ordem e tipos) para qualquer tamanho de bloco.
+  csv_path = str(tmp_path / 'zomato.csv')
+  df.to_csv(csv_path, index=False)
+  path, report = build_snapshot(csv_path, str(tmp_path / 'full.feather'), drop_unused=drop_unused)
+  expected = read_snapshot(path)
+  for chunk_rows in chunk_sizes:
+    path, chunked = build_snapshot(csv_path, str(tmp_path / 'chunked.feather'), drop_unused=drop_unused,
+                                   chunk_rows=chunk_rows)
+    pd.testing.assert_frame_equal(read_snapshot(path), expected)
+    assert chunked['rows'] == report['rows']
+    assert chunked['duplicates'] == len(df) - report['rows']
+
+@pytest.mark.parametrize('drop_unused', [True, False])
+def test_zomato(tmp_path, zomato, drop_unused):
+  # Um bloco pequeno, um que não divide a base, um do tamanho da base e um maior que ela.
+  assert_same(tmp_path, zomato, [500, 2048, len(zomato), 10**6], drop_unused)
+
+def test_duplicates_across_chunks(tmp_path, zomato):
+  # Repetições espalhadas pelo arquivo, longe da primeira ocorrência, em blocos diferentes.
+  df = pd.concat([zomato, zomato.sample(500, random_state=1)]).sample(frac=1, random_state=2)
+  assert_same(tmp_path, df, [250, 3000])
+
+def test_one_row_chunks(tmp_path, zomato):
+  # Blocos de uma linha: colunas inteiras em um bloco e vazias (float) em outro, blocos só com
+  # linhas repetidas e categorias que aparecem em um único bloco.
+  df = pd.concat([zomato.iloc[:40], zomato.iloc[[3, 3, 10]], zomato.iloc[40:60]])
+  assert_same(tmp_path, df, [1, 2, 7])
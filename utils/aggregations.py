@@ -0,0 +1,121 @@
+import pandas as pd
+
+from utils.cache import get_or_compute, selection_key
+from utils.cuisine_index import country_rows, cuisine_index, select_rows, split_cuisines
+from utils.loader import data_version
+from utils.metrics import count, span
+from utils.partials import country_partials, merge, select
+from utils.ranking import top_k
+from utils.rollup import city_counts, city_rollup
+
+# Agregações usadas pelas páginas. Cada função recebe o data frame completo e a seleção da barra
+# lateral e devolve exatamente o que a página exibe; aggregate() guarda o resultado no cache
+# compartilhado, então uma seleção repetida não refaz o filtro nem os agrupamentos.
+
+def aggregate(func, df, **selection):
+  key = selection_key(func.__name__, data_version(), **selection)
+  with span('aggregate.' + func.__name__):
+    return get_or_compute(key, lambda: func(df, **selection))
+
+def filter_countries(df, countries):
+  count('rows_processed_total', len(df), stage='filter')
+  return df.loc[df['Country Name'].isin(countries), :]
+
+def filter_cuisines(df, countries, cuisines, listed=False, how='any'):
+  # Restaurantes dos países e culinárias selecionados, resolvidos pelo índice de culinárias
+  # (utils/cuisine_index.py) em vez de varrer a base.
+  rows = select_rows(cuisine_index(), countries, cuisines, how=how, listed=listed)
+  count('rows_processed_total', len(rows), stage='cuisine_index')
+  return df.iloc[rows]
+
+# Home
+# A página inicial e a visão por países são respondidas pelos agregados parciais por país
+# (utils/partials.py), sem filtrar a base de restaurantes.
+
+def home_metrics(df, countries):
+  return merge(country_partials(), countries)
+
+# Country View
+
+def restaurants_by_country(df, countries):
+  # Quantidade de restaurantes registrados por país.
+  dfCountry = select(country_partials(), countries).loc[:, ['Restaurants']]
+  dfCountry = dfCountry.sort_values('Restaurants', ascending=False).rename_axis('Country').reset_index()
+  return dfCountry.rename(columns = {'Restaurants': 'Number of Restaurants'})
+
+def cities_by_country(df, countries):
+  # Quantidade de cidades registradas por país.
+  dfCountry = select(country_partials(), countries).loc[:, ['Qty of Cities']]
+  return dfCountry.sort_values('Qty of Cities', ascending=False).rename_axis('Country').reset_index()
+
+def votes_by_country(df, countries):
+  # Média de avaliações feitas por país.
+  dfCountry = select(country_partials(), countries).loc[:, ['Votes']].rename_axis('Country').reset_index()
+  return dfCountry.sort_values('Votes', ascending=False).reset_index(drop=True)
+
+def price_by_country(df, countries):
+  # Média de um prato para duas pessoas por país.
+  dfCountry = select(country_partials(), countries).loc[:, ['Price in Dollar for two']]
+  dfCountry = dfCountry.sort_values('Price in Dollar for two', ascending=False).rename_axis('Country').reset_index()
+  return dfCountry.rename(columns = {'Price in Dollar for two': 'USD Price for Two'})
+
+# City View
+# Os gráficos por cidade são respondidos pela tabela de cidades (utils/rollup.py), com as mesmas
+# linhas, na mesma ordem alfabética de grupos, que o groupby sobre a base filtrada produzia. A
+# ordenação final é a mesma de antes, agora sobre no máximo alguns milhares de cidades.
+
+def top_cities(df, countries, top):
+  # Cidades com mais restaurantes na base de dados.
+  dfCity = city_counts(city_rollup(), countries, 'Restaurants', 'Restaurant ID')
+  dfCity = dfCity.sort_values('Restaurant ID', ascending=False).reset_index()
+  return dfCity.rename(columns = {'Country Name': 'Country', 'Restaurant ID': 'Qty of Restaurants'}).head(top)
+
+def top_cities_over_4(df, countries, top):
+  # Cidades com mais restaurantes com avaliação acima de 4.
+  dfCity = city_counts(city_rollup(), countries, 'Over 4', 'Restaurant ID', keep_zero=False)
+  dfCity = dfCity.sort_values('Restaurant ID', ascending=False).reset_index()
+  return dfCity.rename(columns = {'Country Name': 'Country', 'Restaurant ID': 'Qty of Restaurants'}).head(top)
+
+def top_cities_under_2_5(df, countries, top):
+  # Cidades com menos restaurantes com avaliação abaixo de 2.5.
+  dfCity = city_counts(city_rollup(), countries, 'Under 2.5', 'Restaurant ID', keep_zero=False)
+  dfCity = dfCity.sort_values('Restaurant ID', ascending=True).reset_index()
+  return dfCity.rename(columns = {'Country Name': 'Country', 'Restaurant ID': 'Qty of Restaurants'}).head(top)
+
+def top_cities_cuisines(df, countries, top):
+  # Cidades com mais tipos de culinária diferentes.
+  dfCity = city_counts(city_rollup(), countries, 'Cuisines', 'Cuisines')
+  dfCity = dfCity.sort_values('Cuisines', ascending=False).reset_index()
+  return dfCity.rename(columns = {'Country Name': 'Country', 'Cuisines': 'Qty of Cuisines'}).head(top)
+
+# Cuisine View
+
+def cuisine_options(df, countries, listed=False):
+  # Culinárias disponíveis nos países selecionados, na ordem em que aparecem na base. Com
+  # listed=True inclui todas as culinárias listadas por cada restaurante, não só a primeira.
+  rows = country_rows(cuisine_index(), countries)
+  if listed:
+    cuisines, _ = split_cuisines(df['All Cuisines'].iloc[rows])
+    return list(pd.unique(cuisines))
+  return list(df['Cuisines'].iloc[rows].unique())
+
+def best_restaurants(df, countries, cuisines, top, listed=False):
+  # Restaurantes com as melhores notas; empates são decididos pelo menor Restaurant ID.
+  # A seleção é feita por utils/ranking.py, sem ordenar todos os restaurantes filtrados.
+  df1 = filter_cuisines(df, countries, cuisines, listed=listed)
+  return top_k(df1, top, columns=['Restaurant ID', 'Restaurant Name', 'Country Name', 'City',
+                                  'Cuisines', 'Price in Dollar for two', 'Aggregate rating', 'Votes'])
+
+def best_cuisines(df, countries, cuisines, top, listed=False):
+  # Culinárias com as melhores notas médias.
+  df1 = filter_cuisines(df, countries, cuisines, listed=listed)
+  dfCuisines = df1.loc[:, ['Cuisines', 'Aggregate rating']].groupby('Cuisines', observed=True).mean()
+  dfCuisines = dfCuisines.sort_values(['Aggregate rating', 'Cuisines'], ascending=[False, True]).reset_index()
+  return dfCuisines.rename(columns = {'Aggregate rating': 'Rating', 'Cuisines': 'Cuisine'}).head(top)
+
+def worst_cuisines(df, countries, cuisines, top, listed=False):
+  # Culinárias com as piores notas médias.
+  df1 = filter_cuisines(df, countries, cuisines, listed=listed)
+  dfCuisines = df1.loc[:, ['Cuisines', 'Aggregate rating']].groupby('Cuisines', observed=True).mean()
+  dfCuisines = dfCuisines.sort_values(['Aggregate rating', 'Cuisines'], ascending=[True, True]).reset_index()
+  return dfCuisines.rename(columns = {'Aggregate rating': 'Rating', 'Cuisines': 'Cuisine'}).head(top)
@@ -0,0 +1,180 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import sys
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from utils.aggregations import (aggregate, best_cuisines, best_restaurants, cities_by_country, cuisine_options,
+                                home_metrics, price_by_country, restaurants_by_country, top_cities,
+                                top_cities_cuisines, top_cities_over_4, top_cities_under_2_5, votes_by_country,
+                                worst_cuisines)
+from utils.loader import data_version, load_data, pin
+from utils.metrics import count
+from utils.warmup import (CITY_COLUMNS, COUNTRY_COLUMNS, CUISINE_COLUMNS, DEFAULT_COUNTRIES, DEFAULT_CUISINES,
+                          DEFAULT_TOP, HOME_COLUMNS, HOME_COUNTRIES)
+
+# API HTTP local com as mesmas agregações das páginas, em JSON ou Arrow IPC (stream):
+#   GET /v1/top_cities?countries=Brazil,India&top=5
+#   GET /v1/best_cuisines?countries=India&cuisines=BBQ,Italian&listed=1&format=arrow
+#   GET /v1 (consultas disponíveis)    GET /health
+# Os parâmetros omitidos usam os padrões da página de cada consulta; uma lista vazia (countries=)
+# é uma seleção vazia, como a barra lateral sem nenhum item. As consultas usam as mesmas colunas e o mesmo
+# cache das páginas (utils/cache.py), então rodando dentro do processo do Streamlit (com
+# RESTAURANTS_API_PORT definido, serve() é chamado pelas páginas) uma seleção já vista no painel não
+# é recalculada, e vice-versa. Também pode rodar sozinha: python -m utils.api [porta].
+PORT = int(os.environ.get('RESTAURANTS_API_PORT', 0)) or None
+HOST = os.environ.get('RESTAURANTS_API_HOST', '127.0.0.1')
+
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Consulta: função de agregação, colunas carregadas (as mesmas da página) e parâmetros aceitos.
+QUERIES = {
+  'home_metrics': (home_metrics, HOME_COLUMNS, ['countries']),
+  'restaurants_by_country': (restaurants_by_country, COUNTRY_COLUMNS, ['countries']),
+  'cities_by_country': (cities_by_country, COUNTRY_COLUMNS, ['countries']),
+  'votes_by_country': (votes_by_country, COUNTRY_COLUMNS, ['countries']),
+  'price_by_country': (price_by_country, COUNTRY_COLUMNS, ['countries']),
+  'top_cities': (top_cities, CITY_COLUMNS, ['countries', 'top']),
+  'top_cities_over_4': (top_cities_over_4, CITY_COLUMNS, ['countries', 'top']),
+  'top_cities_under_2_5': (top_cities_under_2_5, CITY_COLUMNS, ['countries', 'top']),
+  'top_cities_cuisines': (top_cities_cuisines, CITY_COLUMNS, ['countries', 'top']),
+  'cuisine_options': (cuisine_options, CUISINE_COLUMNS, ['countries', 'listed']),
+  'best_restaurants': (best_restaurants, CUISINE_COLUMNS, ['countries', 'cuisines', 'top', 'listed']),
+  'best_cuisines': (best_cuisines, CUISINE_COLUMNS, ['countries', 'cuisines', 'top', 'listed']),
+  'worst_cuisines': (worst_cuisines, CUISINE_COLUMNS, ['countries', 'cuisines', 'top', 'listed']),
+}
+
+DEFAULTS = {'countries': DEFAULT_COUNTRIES, 'cuisines': DEFAULT_CUISINES, 'top': DEFAULT_TOP, 'listed': False}
+
+# Consultas cuja página tem outros padrões.
+QUERY_DEFAULTS = {
+  'home_metrics': {'countries': HOME_COUNTRIES},
+}
+
+logger = logging.getLogger(__name__)
+
+_server = None
+_started = False
+_lock = threading.Lock()
+
+def parse_value(name, values):
+  # Listas aceitam itens separados por vírgula e/ou o parâmetro repetido.
+  if name in ('countries', 'cuisines'):
+    return [item for value in values for item in value.split(',') if item]
+  value = values[-1]
+  if name == 'top':
+    if not value.isdigit() or int(value) < 1:
+      raise ValueError('top must be a positive integer')
+    return int(value)
+  if value.lower() not in ('1', 'true', 'yes', '0', 'false', 'no'):
+    raise ValueError('listed must be true or false')
+  return value.lower() in ('1', 'true', 'yes')
+
+def parse_selection(name, params):
+  accepted = QUERIES[name][2]
+  unknown = [param for param in params if param not in accepted and param != 'format']
+  if unknown:
+    raise ValueError('Unknown parameters for {}: {}'.format(name, ', '.join(unknown)))
+  defaults = dict(DEFAULTS, **QUERY_DEFAULTS.get(name, {}))
+  return {param: parse_value(param, params[param]) if param in params else defaults[param] for param in accepted}
+
+def query(name, **selection):
+  # Resultado da consulta como data frame (as métricas da página inicial viram uma linha e as
+  # culinárias disponíveis, uma coluna).
+  func, columns, _ = QUERIES[name]
+  pin()
+  result = aggregate(func, load_data(columns=columns), **selection)
+  if isinstance(result, dict):
+    return pd.DataFrame([result])
+  if isinstance(result, list):
+    return pd.DataFrame({'Cuisine': result})
+  return result
+
+def to_json(name, selection, df):
+  return json.dumps({
+    'query': name,
+    'selection': selection,
+    'version': data_version(),
+    'rows': json.loads(df.to_json(orient='records')),
+  }).encode()
+
+def to_arrow(df):
+  import pyarrow as pa
+  table = pa.Table.from_pandas(df, preserve_index=False)
+  sink = pa.BufferOutputStream()
+  with pa.ipc.new_stream(sink, table.schema) as writer:
+    writer.write_table(table)
+  return sink.getvalue().to_pybytes()
+
+class Handler(BaseHTTPRequestHandler):
+  def do_GET(self):
+    url = urlsplit(self.path)
+    path = url.path.rstrip('/')
+    if path == '/health':
+      return self.reply(200, json.dumps({'status': 'ok', 'version': data_version()}).encode())
+    if path == '/v1':
+      return self.reply(200, json.dumps({name: params for name, (_, _, params) in QUERIES.items()}).encode())
+    name = path[len('/v1/'):] if path.startswith('/v1/') else None
+    if name not in QUERIES:
+      return self.error(404, 'Unknown query: {}'.format(url.path))
+
+    params = parse_qs(url.query, keep_blank_values=True)
+    try:
+      selection = parse_selection(name, params)
+    except ValueError as error:
+      return self.error(400, str(error))
+    arrow = params.get('format', [''])[-1] == 'arrow' or ARROW_TYPE in self.headers.get('Accept', '')
+    count('api_requests_total', query=name, format='arrow' if arrow else 'json')
+    try:
+      df = query(name, **selection)
+      if arrow:
+        return self.reply(200, to_arrow(df), ARROW_TYPE)
+      return self.reply(200, to_json(name, selection, df))
+    except Exception:
+      logger.exception('Query %s failed', self.path)
+      return self.error(500, 'Query failed')
+
+  def reply(self, status, body, content_type='application/json'):
+    self.send_response(status)
+    self.send_header('Content-Type', content_type)
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def error(self, status, message):
+    self.reply(status, json.dumps({'error': message}).encode())
+
+  def log_message(self, format, *args):
+    logger.debug(format, *args)
+
+def serve(port=None, host=None):
+  # Inicia a API numa thread em segundo plano, uma única vez por processo. Sem porta (nem
+  # RESTAURANTS_API_PORT) não faz nada; com vários processos na mesma máquina, só o primeiro a
+  # abrir a porta a atende.
+  global _server, _started
+  port = port or PORT
+  with _lock:
+    if _started or not port:
+      return _server
+    _started = True
+    try:
+      _server = ThreadingHTTPServer((host or HOST, port), Handler)
+    except OSError as error:
+      logger.warning('Query API not started on port %s: %s', port, error)
+      return None
+  _server.daemon_threads = True
+  threading.Thread(target=_server.serve_forever, name='api', daemon=True).start()
+  logger.info('Query API listening on http://%s:%s/v1', host or HOST, port)
+  return _server
+
+if __name__ == '__main__':
+  # Uso: python -m utils.api [porta]
+  logging.basicConfig(level=logging.INFO)
+  port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT or 8601
+  server = ThreadingHTTPServer((HOST, port), Handler)
+  logger.info('Query API listening on http://%s:%s/v1', HOST, port)
+  server.serve_forever()
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+import sys
+import threading
+
+import pandas as pd
+
+from utils.metrics import count
+
+# Cache de resultados de agregações compartilhado por todas as sessões do processo. Cada entrada é
+# identificada pela visão, pela versão dos dados e pela seleção normalizada da barra lateral; as
+# entradas menos usadas recentemente são descartadas quando algum dos limites é ultrapassado.
+MAX_ENTRIES = 1024
+MAX_BYTES = 64 * 1024 * 1024
+
+_entries = OrderedDict()
+_sizes = {}
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+_lock = threading.RLock()
+
+def normalize(value):
+  # Seleções com os mesmos itens em outra ordem (ou repetidos) geram a mesma chave.
+  if value is None or isinstance(value, (str, int, float, bool)):
+    return value
+  return tuple(sorted(set(value)))
+
+def selection_key(view, version, **selection):
+  return (view, version) + tuple((name, normalize(value)) for name, value in sorted(selection.items()))
+
+def size_of(value):
+  # Estimativa do tamanho em memória de um resultado.
+  if isinstance(value, (pd.DataFrame, pd.Series)):
+    size = value.memory_usage(deep=True)
+    return int(size.sum()) if isinstance(size, pd.Series) else int(size)
+  if isinstance(value, dict):
+    return sys.getsizeof(value) + sum(size_of(item) for item in value.values())
+  if isinstance(value, (list, tuple)):
+    return sys.getsizeof(value) + sum(size_of(item) for item in value)
+  if hasattr(value, 'to_plotly_json'):
+    # Figuras (utils/figures.py): o tamanho do JSON enviado ao navegador.
+    return len(value.to_json())
+  return sys.getsizeof(value)
+
+def get(key, default=None):
+  with _lock:
+    if key not in _entries:
+      _stats['misses'] += 1
+      count('cache_misses_total', cache='aggregate')
+      return default
+    _entries.move_to_end(key)
+    _stats['hits'] += 1
+    count('cache_hits_total', cache='aggregate')
+    return _entries[key]
+
+def put(key, value):
+  size = size_of(value)
+  with _lock:
+    if key in _entries:
+      _stats['bytes'] -= _sizes.pop(key)
+      del _entries[key]
+    # Resultados maiores que o limite inteiro não são guardados.
+    if size > MAX_BYTES:
+      return value
+    _entries[key] = value
+    _sizes[key] = size
+    _stats['bytes'] += size
+    while len(_entries) > MAX_ENTRIES or _stats['bytes'] > MAX_BYTES:
+      old_key, _ = _entries.popitem(last=False)
+      _stats['bytes'] -= _sizes.pop(old_key)
+      _stats['evictions'] += 1
+    return value
+
+def get_or_compute(key, compute):
+  # Os resultados são compartilhados entre sessões e devem ser tratados como somente leitura.
+  missing = object()
+  value = get(key, missing)
+  if value is missing:
+    value = put(key, compute())
+  return value
+
+def carry_forward(old_version, new_version, countries):
+  # Depois de um delta (utils/ingest.py), os resultados das seleções que não incluem nenhum dos
+  # países afetados continuam válidos e passam para a nova versão dos dados.
+  countries = set(countries)
+  with _lock:
+    for key in [key for key in _entries if key[1] == old_version]:
+      selected = dict(key[2:]).get('countries')
+      if selected is None or countries.intersection(selected):
+        continue
+      new_key = (key[0], new_version) + key[2:]
+      _entries[new_key] = _entries.pop(key)
+      _sizes[new_key] = _sizes.pop(key)
+
+def stats():
+  with _lock:
+    return dict(_stats, entries=len(_entries))
+
+def clear():
+  with _lock:
+    _entries.clear()
+    _sizes.clear()
+    _stats['bytes'] = 0
@@ -0,0 +1,92 @@
+import pandas as pd
+
+from utils.currency import convert, current_rates
+
+countries = {
+1: "India",
+14: "Australia",
+30: "Brazil",
+37: "Canada",
+94: "Indonesia",
+148: "New Zeland",
+162: "Philippines",
+166: "Qatar",
+184: "Singapure",
+189: "South Africa",
+191: "Sri Lanka",
+208: "Turkey",
+214: "United Arab Emirates",
+215: "England",
+216: "United States of America",
+}
+
+colors = {
+"3F7E00": "darkgreen",
+"5BA829": "green",
+"9ACD32": "lightgreen",
+"CDD614": "orange",
+"FFBA00": "red",
+"CBCBC8": "darkred",
+"FF7800": "darkred",
+}
+
+# Faixas de preço conhecidas; qualquer outro valor é considerado "gourmet".
+price_ranges = {
+1: "cheap",
+2: "normal",
+3: "expensive",
+}
+default_price_range = "gourmet"
+
+def lookup(series, table):
+  # Traduz a coluna inteira de uma vez pela tabela. Assim como o acesso direto ao dicionário,
+  # um valor que não está na tabela gera KeyError em vez de virar NaN silenciosamente.
+  result = series.map(table)
+  missing = result.isna()
+  if missing.any():
+    raise KeyError(series[missing].iloc[0])
+  return result
+
+def clear_data(df):
+  # Limpeza
+  # Remove itens duplicados
+  df1 = df.drop_duplicates()
+
+  # Reseta index para não criar o problema de itens "pulados" pelo filtro.
+  # O inplace=True serve para executar as alterações no próprio dataframe (e não como retorno), e
+  # o drop=True serve para ele não gerar uma nova coluna de index.
+  df1.reset_index(inplace=True, drop=True)
+
+  # Disable chained assignments, evita o warning de cópia sobre uma parte do dataframe.
+  pd.options.mode.chained_assignment = None
+
+  # Guarda a lista completa de culinárias (usada pelo índice de culinárias) antes de manter apenas
+  # a primeira.
+  df1['All Cuisines'] = df1['Cuisines'].astype(str)
+
+  # A coluna do dataframe possui várias informações separadas por vírgulas. Mantém apenas o
+  # primeiro valor, separando a coluna inteira de uma vez (valores vazios viram 'nan', como no
+  # str(x) original). Sem expand=True, um data frame vazio (um delta só com o cabeçalho) continua
+  # funcionando.
+  df1['Cuisines'] = df1['Cuisines'].astype(str).str.split(',', n=1).str[0]
+
+  # Cria a coluna com o nome do país a partir da tabela de países.
+  df1['Country Name'] = lookup(df1['Country Code'], countries)
+
+  # Cria a coluna com a descrição da faixa de preço a partir da tabela de faixas.
+  df1['Price Range Description'] = df1['Price range'].map(price_ranges).fillna(default_price_range)
+
+  # Acertando um valor errado em um restaurante na Austrália.
+  df1.loc[(df1['Country Name']=='Australia') & (df1['Average Cost for two']==25000017.0), 'Average Cost for two']=250
+
+  # Acertando uma localização errada em um restaurante na Índia.
+  df1.loc[(df1['City']=='Kochi') & (df1['Restaurant Name']=='KFC') & (df1['Longitude']==0.0), 'Longitude']=76.349474
+
+  # Cria a coluna com o preço em dólar pela tabela de cotações vigente (currency_rates.csv, ver
+  # utils/currency.py). Moedas fora da tabela mantêm o preço original e são registradas no log.
+  df1['Price in Dollar for two'] = convert(df1['Currency'], df1['Average Cost for two'], current_rates()[0])
+
+  # Troca a coluna com a cor em código para descrição a partir da tabela de cores.
+  df1['Rating color'] = lookup(df1['Rating color'], colors)
+
+  return df1
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+# Colunas de texto com poucos valores distintos, guardadas como categorias: cada valor distinto é
+# guardado uma única vez (o dicionário da categoria) e cada linha guarda só um código inteiro.
+CATEGORY_COLUMNS = ['City', 'Country Name', 'Cuisines', 'All Cuisines', 'Currency', 'Rating color',
+                    'Rating text', 'Price Range Description']
+
+# Colunas de texto livre que nenhuma página usa.
+UNUSED_COLUMNS = ['Address', 'Locality', 'Locality Verbose']
+
+def memory_usage(df):
+  return int(df.memory_usage(deep=True, index=True).sum())
+
+def to_categories(df):
+  for column in CATEGORY_COLUMNS:
+    if column in df.columns:
+      df[column] = df[column].astype('category')
+  return df
+
+def downcast(df):
+  # Reduz os inteiros para o menor tipo que comporta os valores. Os floats só passam para 32 bits
+  # quando nenhum valor muda, para não alterar notas, preços e coordenadas exibidos nas páginas.
+  for column in df.select_dtypes(include='integer').columns:
+    df[column] = pd.to_numeric(df[column], downcast='integer')
+  for column in df.select_dtypes(include='floating').columns:
+    values = df[column].to_numpy()
+    small = values.astype(np.float32)
+    if np.array_equal(small.astype(values.dtype), values, equal_nan=True):
+      df[column] = small
+  return df
+
+def compact(df, drop_unused=True):
+  # Versão compacta do data frame limpo e o relatório de memória antes/depois.
+  before = memory_usage(df)
+  if drop_unused:
+    df = df.drop(columns=[column for column in UNUSED_COLUMNS if column in df.columns])
+  else:
+    df = df.copy()
+  df = downcast(to_categories(df))
+  after = memory_usage(df)
+  report = {
+    'rows': len(df),
+    'bytes_before': before,
+    'bytes_after': after,
+    'bytes_saved': before - after,
+    'ratio': round(before / after, 2) if after else None,
+  }
+  return df, report
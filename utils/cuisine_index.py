@@ -0,0 +1,119 @@
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from utils import parallel
+from utils.loader import derived, load_data
+
+# Índice invertido das culinárias: para cada culinária, a lista ordenada das posições (linhas) dos
+# restaurantes que a servem. É construído uma única vez por versão dos dados, e uma seleção de
+# várias culinárias é resolvida pela união ou interseção dessas listas, sem percorrer a base.
+# As posições valem para qualquer conjunto de colunas devolvido por load_data, que mantém sempre a
+# mesma ordem de linhas.
+INDEX_COLUMNS = ['Country Name', 'Cuisines', 'All Cuisines']
+
+def postings(keys, rows):
+  # Agrupa as posições por chave: {chave: array ordenado de posições, sem repetição}.
+  codes, uniques = pd.factorize(keys)
+  order = np.lexsort((rows, codes))
+  codes, rows = codes[order], rows[order]
+  keep = np.ones(len(rows), dtype=bool)
+  keep[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+  codes, rows = codes[keep], rows[keep]
+  if len(codes) == 0:
+    return {}
+  bounds = np.flatnonzero(np.diff(codes)) + 1
+  keys = uniques[codes[np.r_[0, bounds]]]
+  return dict(zip(keys, np.split(rows.astype(np.int32), bounds)))
+
+def split_cuisines(all_cuisines):
+  # Uma linha por (restaurante, culinária listada).
+  listed = all_cuisines.astype(str).str.split(',').explode().str.strip()
+  return listed.to_numpy(dtype=object), listed.index.to_numpy()
+
+def build_index(df):
+  rows = np.arange(len(df))
+  listed, listed_rows = split_cuisines(df['All Cuisines'].reset_index(drop=True))
+  return {
+    'rows': len(df),
+    'country': postings(df['Country Name'].astype(str).to_numpy(dtype=object), rows),
+    'first': postings(df['Cuisines'].astype(str).to_numpy(dtype=object), rows),
+    'listed': postings(listed, listed_rows),
+  }
+
+def parallel_index(df):
+  # Com utils/parallel.py, cada processo indexa uma faixa contígua de linhas; como as faixas estão em
+  # ordem, as listas de cada chave são juntadas já ordenadas.
+  if not parallel.enabled(df):
+    return build_index(df)
+  parts = parallel.ranges(len(df), parallel.WORKERS)
+  result = {'rows': len(df)}
+  indexes = parallel.map_partitions(build_index, df, parts)
+  for table in ('country', 'first', 'listed'):
+    lists = {}
+    for index, rows in zip(indexes, parts):
+      for key, posting in index[table].items():
+        lists.setdefault(key, []).append(posting + rows[0])
+    result[table] = {key: np.concatenate(postings).astype(np.int32) for key, postings in lists.items()}
+  return result
+
+def without(posting, rows):
+  # Lista ordenada sem as posições rows (também ordenadas).
+  if not len(rows):
+    return posting
+  found = np.searchsorted(rows, posting)
+  return posting[rows[np.minimum(found, len(rows) - 1)] != posting]
+
+def update_index(index, change):
+  # Depois de um delta, refaz apenas as listas das chaves presentes nas linhas alteradas, com os
+  # valores antigos (a linha sai da lista) e os novos (a linha entra).
+  df1 = load_data(columns=INDEX_COLUMNS)
+  rows = change['rows']
+  new = build_index(df1.iloc[rows])
+  old = build_index(change['replaced'].loc[:, INDEX_COLUMNS])
+  result = {'rows': len(df1)}
+  for table in ('country', 'first', 'listed'):
+    lists = dict(index[table])
+    for key in set(new[table]) | set(old[table]):
+      kept = without(lists.get(key, np.empty(0, dtype=np.int32)), rows)
+      added = rows[new[table].get(key, [])].astype(np.int32)
+      merged = np.insert(kept, np.searchsorted(kept, added), added)
+      if len(merged):
+        lists[key] = merged
+      else:
+        lists.pop(key, None)
+    result[table] = lists
+  return result
+
+def cuisine_index():
+  return derived('cuisine_index', lambda: parallel_index(load_data(columns=INDEX_COLUMNS)), update=update_index)
+
+def union(arrays):
+  arrays = list(arrays)
+  if not arrays:
+    return np.empty(0, dtype=np.int32)
+  return np.unique(np.concatenate(arrays))
+
+def intersection(arrays):
+  arrays = list(arrays)
+  if not arrays:
+    return np.empty(0, dtype=np.int32)
+  return reduce(np.intersect1d, sorted(arrays, key=len))
+
+def country_rows(index, countries):
+  # Posições dos restaurantes dos países selecionados.
+  return union(index['country'].get(country, []) for country in countries)
+
+def cuisine_rows(index, cuisines, how='any', listed=False):
+  # Posições dos restaurantes com as culinárias selecionadas. Com listed=False considera apenas a
+  # primeira culinária de cada restaurante (a coluna Cuisines); com listed=True, qualquer culinária
+  # da lista completa. how='any' devolve quem serve alguma das culinárias (união) e how='all'
+  # quem serve todas (interseção).
+  table = index['listed' if listed else 'first']
+  arrays = [table.get(cuisine, np.empty(0, dtype=np.int32)) for cuisine in cuisines]
+  return intersection(arrays) if how == 'all' else union(arrays)
+
+def select_rows(index, countries, cuisines, how='any', listed=False):
+  return np.intersect1d(country_rows(index, countries), cuisine_rows(index, cuisines, how, listed),
+                        assume_unique=True)
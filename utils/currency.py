@@ -0,0 +1,88 @@
+import datetime
+import hashlib
+import logging
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import count
+
+# Cotações das moedas em dólar, lidas de um arquivo CSV (Currency, Rate, Effective Date) em vez de
+# ficarem no código. Cada moeda pode ter várias linhas; vale a de data de vigência mais recente até
+# hoje, então uma cotação nova pode ser cadastrada antes de entrar em vigor. Trocar o arquivo não
+# exige reler nem limpar a base: o loader recalcula só a coluna de preço em dólar (utils/loader.py).
+RATES_PATH = os.environ.get('RESTAURANTS_RATES_FILE',
+                            os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         'currency_rates.csv'))
+
+RATE_COLUMNS = ['Currency', 'Rate', 'Effective Date']
+
+logger = logging.getLogger(__name__)
+
+_current = {}
+_lock = threading.Lock()
+
+def read_rates(path=RATES_PATH, on=None):
+  # Tabela vigente na data on (hoje, por padrão), uma linha por moeda. O round_trip lê as cotações
+  # exatamente como o float() do Python.
+  table = pd.read_csv(path, float_precision='round_trip')
+  missing = [column for column in RATE_COLUMNS if column not in table.columns]
+  if missing:
+    raise ValueError('{} is missing columns: {}'.format(path, ', '.join(missing)))
+  table['Effective Date'] = pd.to_datetime(table['Effective Date'])
+  table = table.loc[table['Effective Date'] <= pd.Timestamp(on or datetime.date.today()), RATE_COLUMNS]
+  table = table.sort_values('Effective Date', kind='stable').drop_duplicates('Currency', keep='last')
+  return table.sort_values('Currency').reset_index(drop=True)
+
+def current_rates(path=RATES_PATH):
+  # Cotações vigentes ({moeda: cotação}) e a sua versão, relidas apenas quando o arquivo muda ou o
+  # dia vira (uma cotação cadastrada para amanhã passa a valer sem mexer no arquivo).
+  stat = os.stat(path)
+  key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, datetime.date.today())
+  entry = _current.get(path)
+  if entry is not None and entry[0] == key:
+    return entry[1], entry[2]
+
+  with _lock:
+    entry = _current.get(path)
+    if entry is None or entry[0] != key:
+      table = read_rates(path)
+      rates = dict(zip(table['Currency'], table['Rate'].astype(float)))
+      version = hashlib.sha1(repr(sorted(rates.items())).encode()).hexdigest()
+      entry = (key, rates, version)
+      _current[path] = entry
+    return entry[1], entry[2]
+
+def convert(currency, cost, rates):
+  # Preço em dólar de cada linha. Cada moeda distinta é procurada uma vez na tabela e o fator é
+  # espalhado pelas linhas pelos códigos da coluna. Moedas fora da tabela (e linhas sem moeda)
+  # mantêm o preço original; as desconhecidas são registradas no log e no contador
+  # unknown_currency_rows_total.
+  codes, labels = pd.factorize(currency)
+  factors = np.array([rates.get(label, np.nan) for label in labels], dtype=np.float64)
+  unknown = np.isnan(factors)
+  if unknown.any():
+    rows = np.bincount(codes[codes >= 0], minlength=len(labels))
+    report = {str(labels[i]): int(rows[i]) for i in np.flatnonzero(unknown)}
+    logger.warning('Unknown currencies, prices kept unchanged: %s', report)
+    count('unknown_currency_rows_total', sum(report.values()))
+  # O último fator (1.0) é o das linhas sem moeda, cujo código é -1.
+  factors = np.append(np.where(unknown, 1.0, factors), 1.0)
+  return pd.Series(cost.to_numpy() * factors[codes], index=cost.index)
+
+def unknown_currencies(currency, rates):
+  # Moedas da coluna que não estão na tabela, com o número de linhas de cada uma.
+  counts = pd.Series(currency).value_counts()
+  return {str(label): int(rows) for label, rows in counts.items() if label not in rates}
+
+if __name__ == '__main__':
+  # Uso: python -m utils.currency [zomato.csv] — mostra a tabela vigente e as moedas do CSV sem cotação.
+  table = read_rates()
+  print(table.to_string(index=False))
+  csv_path = sys.argv[1] if len(sys.argv) > 1 else 'zomato.csv'
+  unknown = unknown_currencies(pd.read_csv(csv_path, usecols=['Currency'])['Currency'],
+                               set(table['Currency']))
+  print('Unknown currencies in {}: {}'.format(csv_path, unknown or 'none'))
@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+
+from utils.aggregations import (aggregate, best_cuisines, cities_by_country, filter_countries, price_by_country,
+                                restaurants_by_country, top_cities, top_cities_cuisines, top_cities_over_4,
+                                top_cities_under_2_5, votes_by_country, worst_cuisines)
+from utils.cache import get_or_compute, selection_key
+from utils.geo import geo_index, within_bbox
+from utils.loader import data_version
+from utils.markers import map_markers, marker_data
+
+# Gráficos e mapa prontos para enviar ao navegador, guardados no cache compartilhado (utils/cache.py)
+# com a mesma chave das agregações: visão, versão dos dados e seleção. Uma seleção já vista (ou
+# pré-aquecida por utils/warmup.py) não refaz a agregação, o px.bar nem a busca dos restaurantes do
+# mapa; o Streamlit só serializa a figura pronta.
+#
+# O plotly.express e o folium (com utils/mapping.py) são importados só ao montar o primeiro gráfico ou
+# mapa: as visões por país, cidade e culinária não usam o folium e um processo novo começa a
+# responder sem esperar por essas importações.
+
+# Parâmetros do px.bar de cada agregação mostrada como gráfico de barras.
+CHARTS = {
+  restaurants_by_country: dict(x='Country', y='Number of Restaurants', title='Qty of Restaurants by Country'),
+  cities_by_country: dict(x='Country', y='Qty of Cities', title='Qty of Cities by Country'),
+  votes_by_country: dict(x='Country', y='Votes', title='Qty of Votes by Country'),
+  price_by_country: dict(x='Country', y='USD Price for Two', title='Average USD Price for Two'),
+  top_cities: dict(x='City', y='Qty of Restaurants', color='Country', title='Qty of Restaurants by Country'),
+  top_cities_over_4: dict(x='City', y='Qty of Restaurants', color='Country', title='Qty of Restaurants over 4.0'),
+  top_cities_under_2_5: dict(x='City', y='Qty of Restaurants', color='Country', title='Qty of Restaurants under 2.5'),
+  top_cities_cuisines: dict(x='City', y='Qty of Cuisines', color='Country', title='Qty of Cuisines'),
+  best_cuisines: dict(x='Cuisine', y='Rating', title='Best Cuisines'),
+  worst_cuisines: dict(x='Cuisine', y='Rating', title='Worst Cuisines'),
+}
+
+# Número máximo de barras de um gráfico (ver utils/payload.py).
+CHART_BARS = int(os.environ.get('RESTAURANTS_CHART_BARS', 50))
+
+# Altura e largura do mapa na página inicial.
+MAP_HEIGHT = 600
+MAP_WIDTH = 800
+
+def limit_bars(df, title):
+  # As primeiras CHART_BARS linhas do gráfico (os dados dos gráficos vêm ordenados) e o título, que
+  # indica o corte quando há um.
+  if len(df) <= CHART_BARS:
+    return df, title
+  return df.head(CHART_BARS), '{} (top {} of {})'.format(title, CHART_BARS, len(df))
+
+def trim_template(fig):
+  # O template padrão do plotly traz o estilo de todos os tipos de gráfico e ocupa quase todo o JSON
+  # de um gráfico de barras. Fica só o estilo dos tipos usados na figura; o desenho não muda.
+  import plotly.graph_objects as go
+  template = fig.layout.template
+  types = sorted({trace.type for trace in fig.data})
+  fig.layout.template = go.layout.Template(layout=template.layout, data={name: template.data[name] for name in types})
+  return fig
+
+def chart(func, df, **selection):
+  # Figura do gráfico de barras da agregação func para a seleção, com no máximo CHART_BARS barras e
+  # só o template usado. A figura é compartilhada entre sessões e não deve ser alterada.
+  def build():
+    import plotly.express as px
+    df1, title = limit_bars(aggregate(func, df, **selection), CHARTS[func]['title'])
+    return trim_template(px.bar(df1, **dict(CHARTS[func], title=title)))
+  return get_or_compute(selection_key('chart.' + func.__name__, data_version(), **selection), build)
+
+def map_data(df, countries, bbox=None):
+  # Camada do mapa (utils/mapping.py) com os restaurantes dos países selecionados dentro do retângulo
+  # bbox (sul, oeste, norte, leste; sem bbox, todos), buscados pelo índice espacial (utils/geo.py).
+  def build():
+    from utils.mapping import MAX_MARKERS, map_layer
+    df1 = filter_countries(df, countries)
+    rows = df.index.get_indexer(df1.index)
+    if bbox is not None:
+      inside = np.isin(rows, within_bbox(geo_index(), *bbox), assume_unique=True)
+      df1, rows = df1[inside], rows[inside]
+    data = None
+    if len(df1) <= MAX_MARKERS:
+      # Os marcadores vêm prontos da versão atual dos dados (utils/markers.py).
+      data = marker_data(map_markers(), rows)
+    return map_layer(df1, data)
+  area = dict(zip(('south', 'west', 'north', 'east'), bbox or (None,) * 4))
+  return get_or_compute(selection_key('map', data_version(), countries=countries, **area), build)
+
+def map_figure(df, countries, view=None):
+  # Mapa dos restaurantes dos países selecionados e o número de restaurantes nele. view é a última
+  # área visível informada pelo navegador (bounds, center e zoom do st_folium): o mapa é recriado
+  # nela, só com os restaurantes à vista. O mapa é novo a cada chamada; os dados vêm do cache.
+  from utils.mapping import build_map, view_bbox
+  view = view or {}
+  layer = map_data(df, countries, view_bbox(view.get('bounds')))
+  center = view.get('center')
+  location = [center['lat'], center['lng']] if center else None
+  return build_map(layer, location, view.get('zoom') or 2), layer['restaurants']
+
+def map_html(map):
+  # HTML completo do mapa, para medir o que é enviado ao navegador.
+  import folium as fo
+  return fo.Figure().add_child(map).render()
@@ -0,0 +1,128 @@
+import numpy as np
+
+from utils.loader import derived, load_data
+
+# Índice espacial dos restaurantes: a superfície é dividida em uma grade de células de CELL_SIZE
+# graus e as posições (linhas) dos restaurantes ficam ordenadas pela célula em que caem. Uma busca
+# por retângulo, raio ou vizinhos mais próximos só examina as células que podem conter resultados,
+# sem percorrer todos os restaurantes.
+CELL_SIZE = 0.25
+EARTH_RADIUS_KM = 6371.0088
+
+# Número de colunas da grade (longitude), usado para transformar (linha, coluna) em uma chave única.
+LON_CELLS = int(np.ceil(360 / CELL_SIZE)) + 1
+
+def haversine(lat1, lon1, lat2, lon2):
+  # Distância em km entre pontos em graus (aceita arrays).
+  lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+  a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+  return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+def cell_of(lat, lon):
+  lat_cell = np.floor((np.asarray(lat) + 90) / CELL_SIZE).astype(np.int64)
+  lon_cell = np.floor((np.asarray(lon) + 180) / CELL_SIZE).astype(np.int64)
+  return lat_cell, lon_cell
+
+def build_index(df):
+  lat = df['Latitude'].to_numpy(dtype=float)
+  lon = df['Longitude'].to_numpy(dtype=float)
+  lat_cell, lon_cell = cell_of(lat, lon)
+  keys = lat_cell * LON_CELLS + lon_cell
+  order = np.argsort(keys, kind='stable')
+  return {'lat': lat, 'lon': lon, 'keys': keys[order], 'rows': order}
+
+def geo_index():
+  return derived('geo_index', lambda: build_index(load_data(columns=['Latitude', 'Longitude'])))
+
+def cell_rows(index, lat_cells, lon_ranges):
+  # Posições dos restaurantes nas linhas de células lat_cells, para cada intervalo de colunas.
+  found = []
+  for lat_cell in lat_cells:
+    for first, last in lon_ranges:
+      start, stop = np.searchsorted(index['keys'], [lat_cell * LON_CELLS + first, lat_cell * LON_CELLS + last + 1])
+      found.append(index['rows'][start:stop])
+  return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+def lon_ranges(west, east):
+  # Intervalos de colunas entre duas longitudes; o retângulo pode cruzar o antimeridiano.
+  _, first = cell_of(0, west)
+  _, last = cell_of(0, east)
+  if west <= east:
+    return [(int(first), int(last))]
+  return [(int(first), LON_CELLS - 1), (0, int(last))]
+
+def within_bbox(index, south, west, north, east):
+  # Posições (ordenadas) dos restaurantes dentro do retângulo.
+  south, north = max(south, -90), min(north, 90)
+  if south > north:
+    return np.empty(0, dtype=np.intp)
+  first, _ = cell_of(south, 0)
+  last, _ = cell_of(north, 0)
+  rows = cell_rows(index, range(int(first), int(last) + 1), lon_ranges(west, east))
+  lat, lon = index['lat'][rows], index['lon'][rows]
+  inside = (lat >= south) & (lat <= north)
+  if west <= east:
+    inside &= (lon >= west) & (lon <= east)
+  else:
+    inside &= (lon >= west) | (lon <= east)
+  return np.sort(rows[inside])
+
+def radius_bbox(lat, lon, km):
+  # Retângulo que contém o círculo de raio km em torno do ponto.
+  dlat = np.degrees(km / EARTH_RADIUS_KM)
+  if abs(lat) + dlat >= 90:
+    return max(lat - dlat, -90), -180, min(lat + dlat, 90), 180
+  dlon = np.degrees(np.arcsin(min(np.sin(km / EARTH_RADIUS_KM) / np.cos(np.radians(lat)), 1)))
+  if dlon >= 180:
+    return lat - dlat, -180, lat + dlat, 180
+  west, east = lon - dlon, lon + dlon
+  return lat - dlat, (west + 540) % 360 - 180, lat + dlat, (east + 540) % 360 - 180
+
+def within_radius(index, lat, lon, km):
+  # Posições (ordenadas) dos restaurantes a até km quilômetros do ponto.
+  rows = within_bbox(index, *radius_bbox(lat, lon, km))
+  return rows[haversine(lat, lon, index['lat'][rows], index['lon'][rows]) <= km]
+
+def outside_distance(lat, lon, lat_cell, lon_cell, ring):
+  # Distância mínima (km) do ponto a qualquer restaurante fora do quadrado de células de raio ring:
+  # para sair do quadrado é preciso cruzar o paralelo da borda norte/sul ou o meridiano da borda
+  # leste/oeste, e a distância a um meridiano é asin(cos(lat) * sin(dlon)).
+  north = (lat_cell + ring + 1) * CELL_SIZE - 90
+  south = (lat_cell - ring) * CELL_SIZE - 90
+  bounds = []
+  if north < 90:
+    bounds.append(np.radians(north - lat))
+  if south > -90:
+    bounds.append(np.radians(lat - south))
+  if (2 * ring + 1) * CELL_SIZE < 360:
+    east = (lon_cell + ring + 1) * CELL_SIZE - 180 - lon
+    west = lon - ((lon_cell - ring) * CELL_SIZE - 180)
+    for dlon in (east, west):
+      dlon = np.radians(min(dlon, 90))
+      bounds.append(np.arcsin(np.cos(np.radians(lat)) * np.sin(dlon)))
+  return EARTH_RADIUS_KM * min(bounds) if bounds else np.inf
+
+def nearest(index, lat, lon, k=1):
+  # Posições dos k restaurantes mais próximos do ponto e as distâncias em km, do mais próximo ao
+  # mais distante. O quadrado de células examinado cresce até que nenhum restaurante fora dele
+  # possa estar mais perto que o k-ésimo encontrado.
+  total = len(index['rows'])
+  k = min(k, total)
+  if k <= 0:
+    return np.empty(0, dtype=np.intp), np.empty(0)
+  lat_cell, lon_cell = (int(cell) for cell in cell_of(lat, lon))
+  ring = 0
+  while True:
+    lat_cells = range(max(lat_cell - ring, 0), lat_cell + ring + 1)
+    if (2 * ring + 1) >= LON_CELLS - 1:
+      ranges = [(0, LON_CELLS - 1)]
+    else:
+      first, last = (lon_cell - ring) % (LON_CELLS - 1), (lon_cell + ring) % (LON_CELLS - 1)
+      ranges = [(first, last)] if first <= last else [(first, LON_CELLS - 1), (0, last)]
+    rows = cell_rows(index, lat_cells, ranges)
+    if len(rows) >= k:
+      distances = haversine(lat, lon, index['lat'][rows], index['lon'][rows])
+      best = np.argsort(distances, kind='stable')[:k]
+      if distances[best[-1]] <= outside_distance(lat, lon, lat_cell, lon_cell, ring) or len(rows) == total:
+        return rows[best], distances[best]
+    ring = ring * 2 + 1
@@ -0,0 +1,131 @@
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.cleaning import clear_data
+
+# Ingestão incremental: arquivos de delta com o mesmo esquema do zomato.csv (restaurantes novos e
+# linhas alteradas, como notas e votos) ficam em uma pasta ao lado do CSV e são aplicados, em ordem
+# de nome, sobre os dados limpos. Cada linha é identificada pelo Restaurant ID: um ID novo é
+# acrescentado no fim, um ID existente substitui a linha na mesma posição e uma linha idêntica à
+# que já existe é ignorada, como no drop_duplicates do clear_data. Só as linhas do delta passam pela
+# limpeza; as posições das linhas existentes não mudam.
+KEY = 'Restaurant ID'
+
+def delta_dir(csv_path):
+  # Os deltas do zomato.csv ficam em zomato.deltas/.
+  return os.path.splitext(csv_path)[0] + '.deltas'
+
+def delta_files(csv_path):
+  directory = delta_dir(csv_path)
+  if not os.path.isdir(directory):
+    return []
+  return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith('.csv')]
+
+def read_delta(path):
+  # Mesmas regras de limpeza da base (KeyError para país ou cor desconhecidos).
+  return clear_data(pd.read_csv(path))
+
+def same_values(a, b):
+  # Compara duas colunas elemento a elemento, considerando nulos iguais entre si.
+  if isinstance(a.dtype, pd.CategoricalDtype):
+    return a.cat.codes.to_numpy() == b.cat.codes.to_numpy()
+  return (a.to_numpy() == b.to_numpy()) | (a.isna().to_numpy() & b.isna().to_numpy())
+
+def fit_column(store, values):
+  # Coloca a coluna da base e a do delta no mesmo tipo, sem desfazer a compactação: as categorias
+  # novas são acrescentadas e os números do delta usam o tipo da base quando cabem nele.
+  if isinstance(store.dtype, pd.CategoricalDtype):
+    new = pd.Index(values.dropna().unique()).difference(store.cat.categories)
+    if len(new):
+      store = store.cat.set_categories(store.cat.categories.union(new))
+    return store, pd.Series(pd.Categorical(values, categories=store.cat.categories), index=values.index)
+  if store.dtype == values.dtype:
+    return store, values
+  if store.dtype.kind in 'iuf' and values.dtype.kind in 'iufb':
+    with np.errstate(invalid='ignore'):
+      small = values.astype(store.dtype)
+    if small.astype(values.dtype).equals(values):
+      return store, small
+    dtype = np.result_type(store.dtype, values.dtype)
+    return store.astype(dtype), values.astype(dtype)
+  return store.astype(object), values.astype(object)
+
+def apply_delta(df, delta):
+  # Retorna um novo data frame com o delta (já limpo) aplicado e a descrição da mudança. O data frame
+  # original não é alterado, pois pode estar em uso por outras sessões.
+  missing = [column for column in df.columns if column not in delta.columns]
+  if missing:
+    raise ValueError('Delta is missing columns: {}'.format(', '.join(missing)))
+  # Um mesmo ID repetido no delta: vale a última linha.
+  delta = delta.drop_duplicates(subset=KEY, keep='last').reset_index(drop=True)
+
+  positions = pd.Series(np.arange(len(df)), index=df[KEY].to_numpy())
+  positions = positions[~positions.index.duplicated(keep='last')]
+  found = positions.reindex(delta[KEY].to_numpy()).to_numpy()
+  existing = ~np.isnan(found)
+  rows = found[existing].astype(np.intp)
+
+  columns, fitted = {}, {}
+  for column in df.columns:
+    columns[column], fitted[column] = fit_column(df[column], delta[column])
+
+  same = np.ones(len(rows), dtype=bool)
+  for column in df.columns:
+    same &= same_values(columns[column].iloc[rows].reset_index(drop=True),
+                        fitted[column][existing].reset_index(drop=True))
+  updated = rows[~same]
+  appended = ~existing
+  # Mudança: posições alteradas ou acrescentadas (ordenadas), as linhas substituídas com os valores
+  # antigos e os países afetados (antes e depois).
+  change = {
+    'rows': np.sort(np.concatenate([updated, len(df) + np.arange(appended.sum())])),
+    'replaced': df.iloc[updated],
+    'countries': set(df['Country Name'].iloc[updated].astype(str)) |
+                 set(delta.loc[existing, 'Country Name'][~same].astype(str)) |
+                 set(delta.loc[appended, 'Country Name'].astype(str)),
+    'appended': int(appended.sum()),
+    'updated': len(updated),
+    'unchanged': int(same.sum()),
+  }
+  if not len(change['rows']):
+    return df, change
+
+  result = {}
+  for column in df.columns:
+    values = pd.concat([columns[column], fitted[column][appended]], ignore_index=True)
+    if len(updated):
+      values.iloc[updated] = fitted[column][existing][~same].to_numpy()
+    result[column] = values
+  return pd.DataFrame(result), change
+
+def merge_changes(changes):
+  # Junta as mudanças de vários deltas aplicados em sequência (as posições não mudam entre eles).
+  return {
+    'rows': np.unique(np.concatenate([change['rows'] for change in changes])) if changes else np.empty(0, dtype=np.intp),
+    'replaced': pd.concat([change['replaced'] for change in changes]) if changes else None,
+    'countries': set().union(*(change['countries'] for change in changes)),
+    'appended': sum(change['appended'] for change in changes),
+    'updated': sum(change['updated'] for change in changes),
+    'unchanged': sum(change['unchanged'] for change in changes),
+  }
+
+def add_delta(delta_path, csv_path='zomato.csv'):
+  # Valida o delta com as regras de limpeza e o copia para a pasta de deltas com um prefixo de data,
+  # para que seja aplicado depois dos anteriores. A cópia é renomeada só no fim, então as páginas
+  # nunca leem um delta pela metade.
+  read_delta(delta_path)
+  directory = delta_dir(csv_path)
+  os.makedirs(directory, exist_ok=True)
+  path = os.path.join(directory, time.strftime('%Y%m%d-%H%M%S-') + os.path.basename(delta_path))
+  shutil.copyfile(delta_path, path + '.tmp')
+  os.replace(path + '.tmp', path)
+  return path
+
+if __name__ == '__main__':
+  # Uso: python -m utils.ingest <delta.csv> [zomato.csv]
+  print(add_delta(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else 'zomato.csv'))
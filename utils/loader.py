@@ -0,0 +1,405 @@
+import hashlib
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from utils import cache, shared
+from utils.compact import downcast
+from utils.currency import convert, current_rates
+from utils.ingest import apply_delta, delta_dir, delta_files, merge_changes, read_delta
+from utils.metrics import count, span
+from utils.parallel import parallel_clean
+from utils.snapshot import build_snapshot, has_snapshot, read_snapshot, snapshot_path
+
+# Caminho padrão do arquivo de dados, relativo à raiz do projeto (de onde o streamlit é executado).
+DATA_PATH = 'zomato.csv'
+
+# Descarta as colunas de texto livre que nenhuma página usa (Address, Locality...).
+DROP_UNUSED = True
+
+# Coluna calculada pela tabela de cotações (utils/currency.py) e as colunas de onde ela vem.
+PRICE = 'Price in Dollar for two'
+PRICE_SOURCES = ['Currency', 'Average Cost for two']
+
+# Modo streaming, para CSVs maiores que a memória: com RESTAURANTS_CHUNK_ROWS definido, o CSV nunca é
+# lido inteiro; o snapshot é construído em blocos desse tamanho (utils/streaming.py) e as páginas
+# leem dele apenas as colunas que usam.
+CHUNK_ROWS = int(os.environ.get('RESTAURANTS_CHUNK_ROWS', 0)) or None
+
+logger = logging.getLogger(__name__)
+
+# Estado compartilhado por todas as páginas e sessões do mesmo processo. O Streamlit reexecuta os
+# scripts das páginas a cada clique, mas os módulos importados ficam em memória, então o data frame
+# limpo é construído uma única vez e reaproveitado enquanto o arquivo de origem não mudar.
+#
+# O estado fica numa geração: os dados em memória (data frame, projeções, estruturas derivadas), as
+# mudanças do último delta e, com o atualizador em segundo plano ligado (utils/refresh.py), a versão
+# publicada de cada arquivo. Com uma versão publicada, as páginas recebem os dados dela sem consultar
+# os arquivos; o atualizador constrói a geração seguinte numa cópia e só então a publica, de uma vez.
+#
+# Cada execução de página (e cada consulta da API ou seleção do pré-aquecimento) fixa com pin() a
+# geração e a versão dos dados no início: até o fim dela, data frame, estruturas derivadas e chaves
+# do cache vêm todos dessa versão, mesmo que o atualizador publique outra ou chegue um delta no meio.
+_hashes = {}
+_reports = {}
+_deltas = {}
+_lock = threading.RLock()
+_local = threading.local()
+
+def new_generation():
+  return {'state': {}, 'changes': {}, 'versions': {}, 'lock': threading.RLock()}
+
+_generation = new_generation()
+
+def generation():
+  # A geração publicada, a fixada por pin() na thread atual ou, na thread do atualizador, a que está
+  # sendo construída.
+  return getattr(_local, 'generation', None) or _generation
+
+def pin(path=DATA_PATH):
+  # Fixa, para a thread atual, a geração publicada e a versão atual dos dados de path. Os dados em
+  # memória nesse momento (held) continuam acessíveis à thread mesmo se forem substituídos por uma
+  # versão mais nova, até a próxima chamada. Na thread do atualizador não faz nada.
+  current = getattr(_local, 'generation', None)
+  if current is not None and 'held' not in current:
+    return
+  _local.generation = None
+  gen = _generation
+  version = data_version(path)
+  _local.generation = {'state': gen['state'], 'changes': gen['changes'], 'lock': gen['lock'],
+                       'versions': dict(gen['versions'], **{path: version}), 'held': dict(gen['state'])}
+
+def unpin():
+  current = getattr(_local, 'generation', None)
+  if current is not None and 'held' in current:
+    _local.generation = None
+
+def lookup(gen, name, digest):
+  # Estado name na versão digest, compartilhado ou guardado pela thread fixada por pin().
+  state = gen['state'].get(name)
+  if state is not None and state['hash'] == digest:
+    return state
+  state = gen.get('held', {}).get(name)
+  if state is not None and state['hash'] == digest:
+    return state
+  return None
+
+def store(gen, name, state):
+  gen['state'][name] = state
+  if 'held' in gen:
+    gen['held'][name] = state
+
+def settle(gen, path, version):
+  # Numa thread fixada por pin(), os arquivos podem ter mudado antes da primeira leitura: a versão
+  # fixada passa a ser a dos dados efetivamente lidos.
+  if 'held' in gen:
+    gen['versions'][path] = version
+
+def file_key(path):
+  # Identifica a versão do arquivo pelo caminho, data de modificação e tamanho.
+  stat = os.stat(path)
+  return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+def file_hash(path):
+  # Hash do conteúdo do arquivo, usado apenas quando a data de modificação muda, para não
+  # reprocessar um arquivo que foi apenas "tocado" ou copiado novamente com o mesmo conteúdo.
+  digest = hashlib.sha1()
+  with open(path, 'rb') as f:
+    for block in iter(lambda: f.read(1 << 20), b''):
+      digest.update(block)
+  return digest.hexdigest()
+
+def source_hash(path):
+  # Hash do conteúdo, recalculado apenas quando a data de modificação ou o tamanho do arquivo mudam.
+  key = file_key(path)
+  entry = _hashes.get(path)
+  if entry is not None and entry[0] == key:
+    return entry[1]
+
+  with _lock:
+    entry = _hashes.get(path)
+    if entry is None or entry[0] != key:
+      entry = (key, file_hash(path))
+      _hashes[path] = entry
+    return entry[1]
+
+def cached(name, digest, build):
+  # Executa build() apenas quando a versão dos dados (digest) mudou desde a última chamada com o
+  # mesmo nome.
+  gen = generation()
+  state = lookup(gen, name, digest)
+  if state is not None:
+    count('cache_hits_total', cache='loader')
+    return state['data']
+
+  with gen['lock']:
+    # Outra sessão pode ter recarregado o arquivo enquanto esperávamos o lock.
+    state = lookup(gen, name, digest)
+    if state is None:
+      count('cache_misses_total', cache='loader')
+      state = {'hash': digest, 'data': build()}
+      store(gen, name, state)
+    return state['data']
+
+def base_source(path):
+  # Arquivo de onde vêm os dados: o snapshot, se estiver atualizado, ou o CSV. No modo streaming o
+  # snapshot é (re)construído aqui quando o CSV muda.
+  if CHUNK_ROWS and not has_snapshot(path):
+    with _lock:
+      if not has_snapshot(path):
+        with span('build_snapshot'):
+          _, _reports[path] = build_snapshot(path, drop_unused=DROP_UNUSED, chunk_rows=CHUNK_ROWS)
+        count('rows_processed_total', _reports[path]['rows'], stage='build_snapshot')
+        logger.info('Built snapshot of %s: %s', path, _reports[path])
+  return snapshot_path(path) if has_snapshot(path) else path
+
+def delta_state(path):
+  # Deltas aplicados sobre a base, como pares (arquivo, hash). A listagem só é refeita quando a
+  # pasta muda; os arquivos de delta não são alterados depois de copiados (python -m utils.ingest).
+  directory = delta_dir(path)
+  try:
+    key = os.stat(directory).st_mtime_ns
+  except FileNotFoundError:
+    return ()
+  entry = _deltas.get(path)
+  if entry is not None and entry[0] == key:
+    return entry[1]
+
+  with _lock:
+    entry = _deltas.get(path)
+    if entry is None or entry[0] != key:
+      entry = (key, tuple((file, file_hash(file)) for file in delta_files(path)))
+      _deltas[path] = entry
+    return entry[1]
+
+def combine(base, deltas, rates):
+  digest = hashlib.sha1(base.encode())
+  for _, file_digest in deltas:
+    digest.update(file_digest.encode())
+  digest.update(rates.encode())
+  return digest.hexdigest()
+
+def live_version(path=DATA_PATH):
+  # Versão dos arquivos como estão agora: a base, os deltas e a tabela de cotações.
+  return combine(source_hash(base_source(path)), delta_state(path), current_rates()[1])
+
+def data_version(path=DATA_PATH):
+  # Identifica a versão dos dados servidos por load_data(path), para invalidar resultados derivados
+  # (agregações, gráficos) quando o arquivo de origem, os deltas ou a tabela de cotações mudam. Com
+  # o atualizador ligado, é a versão publicada por ele.
+  version = generation()['versions'].get(path)
+  if version is not None:
+    return version
+  return live_version(path)
+
+def reprice(df1, rates):
+  # Cópia do data frame com o preço em dólar recalculado pela tabela de cotações, sem refazer a
+  # limpeza. O float só é reduzido para 32 bits se nenhum valor mudar, como em utils/compact.py.
+  with span('reprice'):
+    df1 = df1.copy()
+    prices = convert(df1['Currency'], df1['Average Cost for two'], rates)
+    df1[PRICE] = downcast(pd.DataFrame({PRICE: prices}))[PRICE]
+  count('rows_processed_total', len(df1), stage='reprice')
+  return df1
+
+def read_data(path):
+  # Lê, limpa e compacta o CSV (categorias e inteiros menores), registrando a memória economizada.
+  with span('read_csv'):
+    df = pd.read_csv(path)
+  count('rows_processed_total', len(df), stage='read_csv')
+  # Limpeza e compactação, em vários processos se RESTAURANTS_WORKERS estiver definido.
+  with span('clean'):
+    df1, report = parallel_clean(df, drop_unused=DROP_UNUSED)
+  _reports[path] = report
+  logger.info('Loaded %s: %s', path, report)
+  return df1
+
+def read_snapshot_timed(path, columns):
+  with span('read_snapshot'):
+    df1 = read_snapshot(path, columns)
+  count('rows_processed_total', len(df1), stage='read_snapshot')
+  return df1
+
+def read_snapshot_priced(path, columns, rates):
+  # O preço em dólar gravado no snapshot usa as cotações da época em que ele foi construído; ao ler
+  # essa coluna, ela é recalculada pela tabela vigente.
+  if columns is not None and PRICE not in columns:
+    return read_snapshot_timed(path, columns)
+  extra = [column for column in PRICE_SOURCES if columns is not None and column not in columns]
+  df1 = reprice(read_snapshot_timed(path, columns + extra if columns is not None else None), rates)
+  return df1.drop(columns=extra) if extra else df1
+
+def memory_report(path=DATA_PATH):
+  # Relatório de memória da última leitura do CSV ou construção do snapshot no modo streaming (None
+  # se os dados vieram de um snapshot já existente, que é gravado compactado).
+  return _reports.get(path)
+
+def derived(name, build, path=DATA_PATH, update=None):
+  # Estrutura calculada a partir dos dados (agregados parciais, índices), construída uma única vez
+  # por versão dos dados e compartilhada entre as sessões. Se a versão anterior da estrutura e a
+  # mudança aplicada por um delta forem conhecidas, update(anterior, mudança) a atualiza em vez de
+  # reconstruí-la.
+  version = data_version(path)
+  key = ('derived', path, name)
+  gen = generation()
+  state = gen['state'].get(key)
+  change = gen['changes'].get(path)
+  if (update is not None and state is not None and change is not None and
+      change['previous'] == state['hash'] and change['version'] == version):
+    previous = state['data']
+    return cached(key, version, lambda: update(previous, change))
+  return cached(key, version, build)
+
+def load_store(path=DATA_PATH):
+  # Data frame completo: a base (CSV ou snapshot) com os deltas aplicados. Quando só chegam deltas
+  # novos, eles são aplicados sobre a versão em memória, sem reler nem limpar a base; os resultados
+  # em cache das seleções sem nenhum país afetado passam para a nova versão.
+  return read_store(path)[0]
+
+def read_store(path):
+  # O data frame completo e a sua versão.
+  gen = generation()
+  state = lookup(gen, ('store', path), gen['versions'].get(path))
+  if state is not None:
+    count('cache_hits_total', cache='loader')
+    return state['data'], state['hash']
+
+  state = gen['state'].get(('store', path))
+
+  source = base_source(path)
+  base = source_hash(source)
+  deltas = delta_state(path)
+  rates, rates_version = current_rates()
+  version = combine(base, deltas, rates_version)
+  settle(gen, path, version)
+  if state is not None and state['hash'] == version:
+    count('cache_hits_total', cache='loader')
+    return state['data'], version
+
+  with gen['lock']:
+    state = gen['state'].get(('store', path))
+    if state is not None and state['hash'] == version:
+      return state['data'], version
+    count('cache_misses_total', cache='loader')
+    built = {'previous': None, 'changes': []}
+
+    def build():
+      # priced: versão da tabela de cotações usada na coluna de preço (desconhecida no snapshot).
+      if state is not None and state['base'] == base and deltas[:len(state['deltas'])] == state['deltas']:
+        df1, pending, built['previous'] = state['data'], deltas[len(state['deltas']):], state['hash']
+        priced = state['rates']
+      else:
+        df1 = read_data(path) if source == path else read_snapshot_timed(source, None)
+        pending = deltas
+        priced = rates_version if source == path else None
+
+      for file, _ in pending:
+        with span('apply_delta'):
+          delta = read_delta(file)
+          df1, change = apply_delta(df1, delta)
+        count('rows_processed_total', len(delta), stage='delta')
+        logger.info('Applied %s: %s appended, %s updated, %s unchanged', file, change['appended'],
+                    change['updated'], change['unchanged'])
+        built['changes'].append(change)
+      # Cotações novas: só a coluna de preço é recalculada, mas todas as linhas mudam, então as
+      # estruturas derivadas e o cache são refeitos por inteiro.
+      if priced != rates_version:
+        df1, built['previous'] = reprice(df1, rates), None
+      return df1
+
+    # No modo compartilhado (utils/shared.py), o data frame vem da arena da versão, construída por um
+    # único processo da máquina; os demais não sabem o que mudou e refazem as estruturas derivadas.
+    df1 = shared.load(path, version, build) if shared.enabled() else build()
+    previous, changes = built['previous'], built['changes']
+    store(gen, ('store', path), {'hash': version, 'base': base, 'deltas': deltas, 'rates': rates_version,
+                                 'data': df1})
+
+    if previous is not None:
+      change = merge_changes(changes)
+      gen['changes'][path] = dict(change, previous=previous, version=version)
+      cache.carry_forward(previous, version, change['countries'])
+    return df1, version
+
+def load_data(path=DATA_PATH, columns=None):
+  # Retorna o data frame limpo, lendo e limpando o CSV apenas quando ele mudou.
+  # Se existir um snapshot atualizado (python -m utils.snapshot) e nenhum delta, lê apenas as
+  # colunas pedidas direto dele, sem passar pelo CSV nem pela limpeza.
+  # O data frame retornado é compartilhado entre as páginas e sessões: deve ser tratado como
+  # somente leitura. Filtros com df.loc[...] geram cópias e podem ser usados normalmente.
+  columns = list(columns) if columns is not None else None
+  name = (path, tuple(columns) if columns is not None else None)
+
+  # Projeção já pronta na versão publicada pelo atualizador ou fixada por pin(): nenhum arquivo é
+  # consultado.
+  gen = generation()
+  pinned = gen['versions'].get(path)
+  for key in (('snapshot',) + name, ('store',) + name):
+    state = lookup(gen, key, pinned)
+    if state is not None:
+      count('cache_hits_total', cache='loader')
+      return state['data']
+
+  source = base_source(path)
+  if source != path and not delta_state(path) and not shared.enabled():
+    rates, rates_version = current_rates()
+    version = combine(source_hash(source), (), rates_version)
+    settle(gen, path, version)
+    return cached(('snapshot',) + name, version, lambda: read_snapshot_priced(source, columns, rates))
+
+  # A projeção fica no cache com a versão do data frame de onde saiu.
+  df1, version = read_store(path)
+  if columns is None:
+    return df1
+  if shared.enabled():
+    return cached(('store',) + name, version, lambda: shared.select(df1, columns))
+  return cached(('store',) + name, version, lambda: df1.loc[:, columns])
+
+def published_version(path=DATA_PATH):
+  return _generation['versions'].get(path)
+
+def publish(path, version):
+  # Passa a servir a versão version de path, já carregada (ou a ser carregada pelas páginas) na
+  # geração atual.
+  _generation['versions'][path] = version
+
+def rebuild(path=DATA_PATH, prepare=None):
+  # Constrói a próxima geração com os dados atuais de path e a publica. Até a publicação, as páginas
+  # continuam recebendo a geração anterior, completa, sem esperar pela leitura nem pela limpeza.
+  # A nova geração parte de uma cópia da atual, então deltas novos são aplicados sobre o data frame
+  # em memória como em load_store(). As projeções já pedidas pelas páginas são refeitas e prepare()
+  # é executado já na nova versão (estruturas derivadas, aquecimento do cache). Uma reconstrução por
+  # vez (utils/refresh.py); retorna a versão publicada.
+  global _generation
+  current = _generation
+  gen = new_generation()
+  gen['state'].update(current['state'])
+  gen['changes'].update(current['changes'])
+  gen['versions'].update((other, version) for other, version in current['versions'].items() if other != path)
+  pinned, _local.generation = getattr(_local, 'generation', None), gen
+  try:
+    version = live_version(path)
+    projections = [key[2] for key in current['state']
+                   if len(key) == 3 and key[0] in ('store', 'snapshot') and key[1] == path]
+    for columns in projections:
+      load_data(path, columns=list(columns) if columns is not None else None)
+    store = gen['state'].get(('store', path))
+    if store is not None:
+      version = store['hash']
+    gen['versions'][path] = version
+    if prepare is not None:
+      prepare()
+  finally:
+    _local.generation = pinned
+  _generation = gen
+  return version
+
+def reset():
+  # Descarta os dados e estruturas derivadas em memória; a próxima chamada relê o arquivo.
+  global _generation
+  with _lock:
+    _generation = new_generation()
+    _hashes.clear()
+    _reports.clear()
+    _deltas.clear()
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from utils.markers import fragments
+
+# Acima desse número de restaurantes o mapa deixa de enviar um ponto por restaurante e passa a
+# enviar grupos já agregados no servidor, para que o tamanho do HTML não cresça com o filtro.
+MAX_MARKERS = 10000
+
+# Número máximo de grupos desenhados no modo agregado.
+MAX_CLUSTERS = 500
+
+# Menor passo, em graus, da grade em que a área visível do mapa é arredondada (ver view_bbox).
+VIEW_STEP = 0.25
+
+# Monta o marcador de cada restaurante no navegador. O popup é montado só quando é aberto, a partir
+# dos campos da linha: [lat, lon, cor, nome, culinária, cidade, país, preço, moeda, nota].
+MARKER_CALLBACK = """function (row) {
+  var icon = L.AwesomeMarkers.icon({icon: 'home', prefix: 'fa', markerColor: row[2]});
+  var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+  marker.bindPopup(function () {
+    return '<b>' + row[3] + '</b><br/>' + row[4] + '<br/>' +
+           row[5] + ' (' + row[6] + ')<br/><br/>' +
+           row[7] + ' ' + row[8] + '<br/>' + 'Rating ' + row[9];
+  }, {maxWidth: 500});
+  return marker;
+}"""
+
+# Camada de marcadores agrupados no navegador, como a do FastMarkerCluster, mas que recebe os dados já
+# em JSON (utils/markers.py) em vez de validar e converter cada linha a cada mapa.
+LAYER_TEMPLATE = """
+{% macro script(this, kwargs) %}
+    var {{ this.get_name() }} = (function(){
+        {{ this.callback }}
+
+        var data = {{ this.rows }};
+        var cluster = L.markerClusterGroup({{ this.options|tojson }});
+
+        for (var i = 0; i < data.length; i++) {
+            var row = data[i];
+            var marker = callback(row);
+            marker.addTo(cluster);
+        }
+
+        cluster.addTo({{ this._parent.get_name() }});
+        return cluster;
+    })();
+{% endmacro %}"""
+
+_layer_template = None
+
+def marker_layer(data):
+  global _layer_template
+  from folium.plugins import FastMarkerCluster
+  from jinja2 import Template
+
+  if _layer_template is None:
+    _layer_template = Template(LAYER_TEMPLATE)
+  layer = FastMarkerCluster([], callback=MARKER_CALLBACK)
+  layer._template = _layer_template
+  layer.rows = data
+  return layer
+
+def grid_clusters(df, max_clusters=MAX_CLUSTERS):
+  # Agrupa os restaurantes em células de uma grade de latitude/longitude, dobrando o tamanho da
+  # célula até que o número de células ocupadas caiba no limite.
+  lat = df['Latitude'].to_numpy(dtype=float)
+  lon = df['Longitude'].to_numpy(dtype=float)
+  size = 0.01
+  while True:
+    cells = pd.DataFrame({'lat': np.floor(lat / size), 'lon': np.floor(lon / size)})
+    codes, uniques = pd.factorize(pd.MultiIndex.from_frame(cells))
+    if len(uniques) <= max_clusters or size >= 360:
+      break
+    size = size * 2
+
+  clusters = pd.DataFrame({
+    'cell': codes,
+    'Latitude': lat,
+    'Longitude': lon,
+    'Aggregate rating': df['Aggregate rating'].to_numpy(dtype=float),
+  })
+  return clusters.groupby('cell').agg(**{
+    'Latitude': ('Latitude', 'mean'),
+    'Longitude': ('Longitude', 'mean'),
+    'Restaurants': ('Latitude', 'size'),
+    'Rating': ('Aggregate rating', 'mean'),
+  }).reset_index(drop=True)
+
+def view_bbox(bounds):
+  # Retângulo (sul, oeste, norte, leste) de dados a enviar para a área visível do mapa (os bounds do
+  # Leaflet), arredondado para fora numa grade com passo maior que a área: um pequeno deslocamento
+  # do mapa mantém o mesmo retângulo, e o mesmo resultado em cache. None se a área for desconhecida
+  # ou cobrir a Terra inteira.
+  if not bounds:
+    return None
+  south, west = bounds['_southWest']['lat'], bounds['_southWest']['lng']
+  north, east = bounds['_northEast']['lat'], bounds['_northEast']['lng']
+  if None in (south, west, north, east):
+    return None
+  step = VIEW_STEP
+  while step < max(north - south, east - west) / 2:
+    step = step * 2
+  south, north = max(np.floor(south / step) * step, -90.0), min(np.ceil(north / step) * step, 90.0)
+  west, east = np.floor(west / step) * step, np.ceil(east / step) * step
+  if east - west >= 360:
+    if south <= -90 and north >= 90:
+      return None
+    west, east = -180.0, 180.0
+  else:
+    # O Leaflet continua contando a longitude depois de dar a volta no antimeridiano.
+    west, east = (west + 180) % 360 - 180, (east + 180) % 360 - 180
+  return float(south), float(west), float(north), float(east)
+
+def map_layer(df, data=None, max_markers=MAX_MARKERS):
+  # O que o mapa dos restaurantes do data frame desenha. Até max_markers restaurantes, uma única
+  # camada com os dados de cada ponto, agrupados por zoom no navegador; acima disso, no máximo
+  # MAX_CLUSTERS grupos agregados no servidor. data é a lista JSON dos marcadores do data frame já
+  # montada (utils/markers.py); sem ela, é montada aqui.
+  layer = {'restaurants': len(df), 'center': [df['Latitude'].mean(), df['Longitude'].mean()]}
+  if len(df) <= max_markers:
+    layer['markers'] = data if data is not None else '[' + ', '.join(fragments(df)) + ']'
+  else:
+    layer['clusters'] = grid_clusters(df)
+  return layer
+
+def build_map(layer, location=None, zoom=2):
+  # Cria o mapa da camada (map_layer), centrado em location (o centro dos restaurantes, por padrão).
+  # O folium é importado aqui, e não no topo do módulo, para que as páginas não paguem a importação
+  # antes de montar o primeiro mapa.
+  import folium as fo
+
+  map = fo.Map(location or layer['center'], zoom_start=zoom)
+  if 'markers' in layer:
+    marker_layer(layer['markers']).add_to(map)
+    return map
+
+  clusters = layer['clusters']
+  scale = np.sqrt(clusters['Restaurants'] / clusters['Restaurants'].max())
+  for cluster, radius in zip(clusters.itertuples(index=False), 5 + 25 * scale):
+    fo.CircleMarker([cluster.Latitude, cluster.Longitude],
+                    radius=float(radius),
+                    color='#3186cc', fill=True, fill_opacity=0.6,
+                    tooltip='{} restaurants - Rating {:.1f}'.format(cluster.Restaurants, cluster.Rating)).add_to(map)
+  return map
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.loader import derived, load_data
+
+# Dados dos marcadores do mapa (utils/mapping.py), montados uma única vez por versão dos dados, e não
+# a cada mapa: para cada restaurante, a linha JSON com a posição, a cor do ícone e os campos do popup
+# ([lat, lon, cor, nome, culinária, cidade, país, preço, moeda, nota]). Cada valor distinto de uma
+# coluna é convertido uma vez e as linhas são concatenadas coluna a coluna. As linhas ficam juntas
+# num único texto, com o início de cada uma em offsets (na ordem das linhas da base), o que ocupa
+# bem menos memória que uma string por restaurante. Um mapa só junta as linhas dos restaurantes
+# filtrados.
+MARKER_COLUMNS = ['Latitude', 'Longitude', 'Rating color', 'Restaurant Name', 'Cuisines', 'City', 'Country Name',
+                  'Average Cost for two', 'Currency', 'Aggregate rating']
+
+# Coordenadas vão como números; os demais campos, como texto, para aparecerem exatamente como no
+# str() do Python (ex.: 4.0).
+NUMBER_COLUMNS = ['Latitude', 'Longitude']
+
+def to_json(value):
+  # O mesmo JSON do filtro tojson do Jinja, usado pelo folium nos dados do FastMarkerCluster.
+  text = json.dumps(value)
+  return text.replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026').replace("'", '\\u0027')
+
+def encode(series, convert):
+  # JSON de cada linha da coluna, convertendo cada valor distinto uma única vez. O último item é o
+  # das linhas vazias (código -1 do factorize).
+  if convert is float:
+    # Coordenadas são quase todas distintas: o repr() de cada float é o próprio JSON.
+    return list(map(repr, series.astype(np.float64).tolist()))
+  codes, uniques = pd.factorize(series)
+  values = np.array([to_json(convert(value)) for value in uniques] + [to_json(convert(np.nan))], dtype=object)
+  return values[codes].tolist()
+
+def fragments(df):
+  # Linha JSON de cada restaurante do data frame.
+  parts = [encode(df[column], float if column in NUMBER_COLUMNS else str) for column in MARKER_COLUMNS]
+  return ['[' + line + ']' for line in map(', '.join, zip(*parts))]
+
+def pack(lines):
+  lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+  return {'text': ''.join(lines), 'offsets': np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(lengths)])}
+
+def unpack(markers, rows):
+  text, offsets = markers['text'], markers['offsets']
+  return [text[start:end] for start, end in zip(offsets[rows].tolist(), offsets[rows + 1].tolist())]
+
+def build_markers(df):
+  return pack(fragments(df.loc[:, MARKER_COLUMNS]))
+
+def update_markers(markers, change):
+  # Depois de um delta, refaz apenas as linhas alteradas ou acrescentadas.
+  df1 = load_data(columns=MARKER_COLUMNS)
+  lines = unpack(markers, np.arange(len(markers['offsets']) - 1))
+  lines.extend([''] * (len(df1) - len(lines)))
+  rows = change['rows']
+  for row, line in zip(rows.tolist(), fragments(df1.iloc[rows])):
+    lines[row] = line
+  return pack(lines)
+
+def map_markers():
+  return derived('map_markers', lambda: build_markers(load_data(columns=MARKER_COLUMNS)), update=update_markers)
+
+def marker_data(markers, rows):
+  # A lista JSON dos marcadores das linhas rows (posições na base), pronta para o mapa.
+  return '[' + ', '.join(unpack(markers, np.asarray(rows, dtype=np.int64))) + ']'
@@ -0,0 +1,150 @@
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+# Instrumentação das páginas: intervalos de tempo com nome (span), contadores (acertos de cache,
+# linhas processadas) e um painel de depuração na barra lateral. Fica desligada por padrão; com
+# RESTAURANTS_METRICS=1 cada execução das páginas é registrada, gravada no log como uma linha JSON e,
+# se RESTAURANTS_METRICS_FILE estiver definido, exportada nesse arquivo no formato texto do
+# Prometheus (para o textfile collector do node_exporter).
+# Desligada, span() devolve sempre o mesmo contexto vazio e count() retorna na primeira linha.
+ENABLED = os.environ.get('RESTAURANTS_METRICS', '').lower() not in ('', '0', 'false', 'no')
+TEXTFILE = os.environ.get('RESTAURANTS_METRICS_FILE')
+
+logger = logging.getLogger(__name__)
+
+_NOOP = contextlib.nullcontext()
+_spans = {}
+_counters = {}
+_lock = threading.Lock()
+# Cada sessão do Streamlit executa o script da página na sua própria thread.
+_local = threading.local()
+
+def enable(value=True):
+  global ENABLED
+  ENABLED = value
+
+def span(name):
+  # Uso: with span('load_data'): ...
+  if not ENABLED:
+    return _NOOP
+  return _timed(name)
+
+@contextlib.contextmanager
+def _timed(name):
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    record(name, time.perf_counter() - start)
+
+def record(name, seconds):
+  with _lock:
+    total = _spans.setdefault(name, {'count': 0, 'sum': 0.0, 'max': 0.0})
+    total['count'] += 1
+    total['sum'] += seconds
+    total['max'] = max(total['max'], seconds)
+  run = getattr(_local, 'run', None)
+  if run is not None:
+    run['spans'].append((name, seconds))
+
+def count(name, value=1, **labels):
+  # Incrementa um contador; os rótulos viram labels do Prometheus (ex.: cache='aggregate').
+  if not ENABLED:
+    return
+  key = (name, tuple(sorted(labels.items())))
+  with _lock:
+    _counters[key] = _counters.get(key, 0) + value
+
+def sent(name, size):
+  # Bytes de um elemento enviado ao navegador (gráfico, tabela, mapa), contados antes do cache de
+  # mensagens do Streamlit: um elemento igual ao da execução anterior é enviado só como referência.
+  if not ENABLED:
+    return
+  count('payload_bytes_total', size, element=name)
+  run = getattr(_local, 'run', None)
+  if run is not None:
+    run['payload'].append((name, size))
+
+def begin_run(page):
+  if not ENABLED:
+    return
+  _local.run = {'page': page, 'start': time.perf_counter(), 'spans': [], 'payload': []}
+
+def end_run():
+  # Fecha a execução da página: registra a linha JSON, atualiza o arquivo do Prometheus e mostra o
+  # painel de depuração na barra lateral.
+  run = getattr(_local, 'run', None)
+  if not ENABLED or run is None:
+    return None
+  _local.run = None
+  run['seconds'] = time.perf_counter() - run.pop('start')
+  record('run.' + run['page'], run['seconds'])
+  logger.info(json.dumps({'event': 'rerun', 'page': run['page'], 'seconds': round(run['seconds'], 6),
+                          'spans': [{'name': name, 'seconds': round(seconds, 6)} for name, seconds in run['spans']],
+                          'payload': [{'name': name, 'bytes': size} for name, size in run['payload']]}))
+  if TEXTFILE:
+    # Uma falha ao exportar (disco cheio, pasta sem permissão) não interrompe a página.
+    try:
+      write_prometheus(TEXTFILE)
+    except Exception:
+      logger.exception('Could not write metrics to %s', TEXTFILE)
+  render_panel(run)
+  return run
+
+def snapshot():
+  with _lock:
+    return {name: dict(total) for name, total in _spans.items()}, dict(_counters)
+
+def labels_text(labels):
+  if not labels:
+    return ''
+  return '{' + ','.join('{}="{}"'.format(key, str(value).replace('"', '\\"')) for key, value in labels) + '}'
+
+def to_prometheus():
+  # Métricas no formato texto de exposição do Prometheus.
+  spans, counters = snapshot()
+  lines = ['# TYPE restaurants_span_seconds summary']
+  for name, total in sorted(spans.items()):
+    label = labels_text([('span', name)])
+    lines.append('restaurants_span_seconds_sum{} {:.6f}'.format(label, total['sum']))
+    lines.append('restaurants_span_seconds_count{} {}'.format(label, total['count']))
+  lines.append('# TYPE restaurants_span_seconds_max gauge')
+  for name, total in sorted(spans.items()):
+    lines.append('restaurants_span_seconds_max{} {:.6f}'.format(labels_text([('span', name)]), total['max']))
+  for name in sorted({name for name, _ in counters}):
+    lines.append('# TYPE restaurants_{} counter'.format(name))
+    for (counter, labels), value in sorted(counters.items()):
+      if counter == name:
+        lines.append('restaurants_{}{} {}'.format(name, labels_text(labels), value))
+  return '\n'.join(lines) + '\n'
+
+def write_prometheus(path):
+  # Cada execução grava num arquivo temporário próprio, na mesma pasta, e o troca pelo arquivo final
+  # de uma vez: execuções simultâneas não apagam o temporário umas das outras.
+  fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.metrics-', suffix='.tmp')
+  try:
+    with os.fdopen(fd, 'w') as f:
+      f.write(to_prometheus())
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+  except BaseException:
+    with contextlib.suppress(OSError):
+      os.remove(tmp_path)
+    raise
+
+def render_panel(run):
+  import streamlit as st
+
+  with st.sidebar.expander('Debug: timings'):
+    st.markdown('**{}** rerun: {:.1f} ms'.format(run['page'], run['seconds'] * 1000))
+    st.table([{'span': name, 'ms': round(seconds * 1000, 2)} for name, seconds in run['spans']])
+    if run['payload']:
+      st.table([{'element': name, 'bytes': size} for name, size in run['payload']])
+    _, counters = snapshot()
+    st.table([{'counter': name + labels_text(labels), 'value': value}
+              for (name, labels), value in sorted(counters.items())])
@@ -0,0 +1,123 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from utils.cleaning import clear_data
+from utils.compact import compact, downcast, memory_usage
+
+# Execução opcional em vários processos: com RESTAURANTS_WORKERS=N (N > 1), a limpeza e as estruturas
+# derivadas mais pesadas (agregados por país, índice de culinárias) são calculadas em N partes num
+# pool de processos e depois juntadas, com o mesmo resultado da execução serial. Bases menores que
+# MIN_ROWS continuam seriais, pois criar o pool e copiar os dados custaria mais que o ganho.
+WORKERS = int(os.environ.get('RESTAURANTS_WORKERS', 0))
+MIN_ROWS = 200_000
+
+# Data frame compartilhado com os processos filhos, definido em cada filho pelo initializer do pool.
+# Com fork, eles herdam a memória do processo pai e cada um lê só as suas linhas, sem que a base
+# inteira seja serializada. Mas um fork feito com outras threads rodando (o servidor do Streamlit, o
+# atualizador, o pré-aquecimento) pode travar o filho num lock que uma delas segurava (logging,
+# métricas); por isso o fork só é usado em processos com uma única thread, como python -m
+# utils.snapshot. Nos demais casos as partes são enviadas, serializadas, a um pool forkserver.
+_frame = None
+
+def enabled(df):
+  return WORKERS > 1 and len(df) >= MIN_ROWS
+
+def partitions(df, column, parts, split=None):
+  # Divide as posições das linhas em até parts grupos de tamanho parecido sem separar linhas com o
+  # mesmo valor em column. Um valor com mais linhas que a parte de cada grupo (a Índia, por exemplo)
+  # é dividido pela coluna split, que também mantém juntas as linhas com o mesmo valor.
+  codes, _ = pd.factorize(df[column])
+  order = np.argsort(codes, kind='stable')
+  bounds = np.flatnonzero(np.diff(codes[order])) + 1
+  share = len(df) / parts
+  groups = []
+  for rows in np.split(order, bounds):
+    if split is not None and len(rows) > share:
+      keys = pd.factorize(df[split].to_numpy()[rows])[0] % int(np.ceil(len(rows) / share))
+      groups.extend(rows[keys == key] for key in np.unique(keys))
+    else:
+      groups.append(rows)
+
+  # Os grupos maiores primeiro, cada um na parte com menos linhas até então.
+  buckets = [[] for _ in range(parts)]
+  loads = np.zeros(parts, dtype=np.int64)
+  for rows in sorted(groups, key=len, reverse=True):
+    bucket = int(np.argmin(loads))
+    buckets[bucket].append(rows)
+    loads[bucket] += len(rows)
+  return [np.sort(np.concatenate(bucket)) for bucket in buckets if bucket]
+
+def ranges(rows, parts):
+  # Faixas contíguas de posições, em ordem.
+  return [part for part in np.array_split(np.arange(rows), parts) if len(part)]
+
+def share(df):
+  global _frame
+  _frame = df
+
+def apply_shared(func, rows):
+  return func(_frame.iloc[rows])
+
+def can_fork():
+  return 'fork' in multiprocessing.get_all_start_methods() and threading.active_count() == 1
+
+def map_partitions(func, df, parts):
+  # Executa func(df.iloc[linhas]) para cada parte no pool e devolve os resultados na mesma ordem.
+  # func precisa ser uma função de módulo (os processos a recebem serializada).
+  workers = min(WORKERS, len(parts))
+  if can_fork():
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'),
+                             initializer=share, initargs=(df,)) as pool:
+      return list(pool.map(apply_shared, [func] * len(parts), parts))
+  method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else None
+  with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method)) as pool:
+    return list(pool.map(func, [df.iloc[rows] for rows in parts]))
+
+def clean_part(part, drop_unused=True):
+  # Posições (na base original) das linhas mantidas pelo drop_duplicates, a parte limpa e compactada
+  # e o relatório de memória da parte.
+  keep = ~part.duplicated().to_numpy()
+  df1, report = compact(clear_data(part), drop_unused=drop_unused)
+  return part.index.to_numpy()[keep], df1, report
+
+def concat_column(values):
+  # Junta a mesma coluna de várias partes. As categorias de cada parte são unidas e ordenadas, como
+  # o astype('category') faria com a coluna inteira.
+  if isinstance(values[0].dtype, pd.CategoricalDtype):
+    return pd.Series(union_categoricals(values, sort_categories=True))
+  return pd.concat(values, ignore_index=True)
+
+def parallel_clean(df, drop_unused=True):
+  # Mesmo resultado de compact(clear_data(df)). As partes seguem o Country Code (e o Restaurant ID
+  # nos países muito grandes): linhas repetidas têm os mesmos valores, então caem na mesma parte e o
+  # drop_duplicates de cada parte equivale ao da base inteira. Cada processo já devolve a sua parte
+  # compactada, o que reduz a cópia de volta; no fim as linhas voltam à ordem original e os inteiros
+  # e floats são reduzidos de novo olhando a base inteira.
+  if not enabled(df):
+    return compact(clear_data(df), drop_unused=drop_unused)
+  df = df.reset_index(drop=True)
+  parts = partitions(df, 'Country Code', WORKERS, split='Restaurant ID')
+  results = map_partitions(partial(clean_part, drop_unused=drop_unused), df, parts)
+  order = np.argsort(np.concatenate([rows for rows, _, _ in results]), kind='stable')
+  frames = [part for _, part, _ in results]
+  df1 = pd.DataFrame({column: concat_column([part[column] for part in frames]).take(order).reset_index(drop=True)
+                      for column in frames[0].columns})
+  df1 = downcast(df1)
+  pd.options.mode.chained_assignment = None
+
+  before = sum(report['bytes_before'] for _, _, report in results)
+  after = memory_usage(df1)
+  return df1, {
+    'rows': len(df1),
+    'bytes_before': before,
+    'bytes_after': after,
+    'bytes_saved': before - after,
+    'ratio': round(before / after, 2) if after else None,
+  }
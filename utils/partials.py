@@ -0,0 +1,85 @@
+import pandas as pd
+
+from utils import parallel
+from utils.loader import derived, load_data
+
+# Agregados parciais por país, calculados uma única vez por versão dos dados. Qualquer seleção de
+# países da barra lateral é respondida juntando no máximo 15 linhas desta tabela, sem filtrar nem
+# reagrupar a base de restaurantes inteira.
+PARTIAL_COLUMNS = ['Restaurant ID', 'Country Code', 'Country Name', 'City', 'Cuisines', 'Votes',
+                   'Price in Dollar for two', 'Aggregate rating']
+
+def distinct(groups, column):
+  # Conjunto de valores distintos (sem nulos) de cada grupo.
+  return pd.Series({name: frozenset(values.dropna().unique()) for name, values in groups[column]}, dtype=object)
+
+def build_partials(df, ids=None):
+  # Uma linha por país com contagens, somas, médias e os conjuntos de valores distintos necessários
+  # para juntar países sem contar duas vezes cidades, culinárias ou restaurantes. Os conjuntos de
+  # IDs, os maiores, podem vir prontos (ids) quando só parte dos restaurantes mudou.
+  df1 = df.assign(**{'Over 4': df['Aggregate rating'] >= 4, 'Under 2.5': df['Aggregate rating'] < 2.5})
+  groups = df1.groupby('Country Name', observed=True)
+  partials = pd.DataFrame({
+    'Restaurants': groups['Restaurant ID'].count(),
+    'Votes sum': groups['Votes'].sum(),
+    'Votes': groups['Votes'].mean(),
+    'Price in Dollar for two': groups['Price in Dollar for two'].mean(),
+    'Over 4': groups['Over 4'].sum(),
+    'Under 2.5': groups['Under 2.5'].sum(),
+    'Restaurant IDs': distinct(groups, 'Restaurant ID') if ids is None else ids,
+    'Country Codes': distinct(groups, 'Country Code'),
+    'Cities': distinct(groups, 'City'),
+    'Cuisines': distinct(groups, 'Cuisines'),
+  }).sort_index()
+  partials['Qty of Cities'] = partials['Cities'].map(len)
+  partials.index = partials.index.astype(str)
+  return partials
+
+def parallel_partials(df):
+  # Os agregados de um país dependem só das linhas dele: com utils/parallel.py cada processo calcula
+  # os de alguns países.
+  if not parallel.enabled(df):
+    return build_partials(df)
+  parts = parallel.partitions(df, 'Country Name', parallel.WORKERS)
+  return pd.concat(parallel.map_partitions(build_partials, df, parts)).sort_index()
+
+def update_partials(partials, change):
+  # Depois de um delta, recalcula apenas as linhas dos países afetados. Os conjuntos de IDs não são
+  # refeitos: perdem os IDs das linhas substituídas e ganham os das linhas novas.
+  countries = change['countries']
+  df1 = load_data(columns=PARTIAL_COLUMNS)
+  replaced = change['replaced']
+  added = df1.iloc[change['rows']]
+  replaced_countries = replaced['Country Name'].astype(str).to_numpy()
+  added_countries = added['Country Name'].astype(str).to_numpy()
+  ids = {}
+  for country in countries:
+    old = partials['Restaurant IDs'].get(country, frozenset())
+    removed = replaced['Restaurant ID'].to_numpy()[replaced_countries == country]
+    new = added['Restaurant ID'].to_numpy()[added_countries == country]
+    ids[country] = (old - frozenset(removed)) | frozenset(new)
+  df1 = df1.loc[df1['Country Name'].isin(countries), :]
+  rows = partials.loc[~partials.index.isin(countries), :]
+  if len(df1):
+    present = df1['Country Name'].unique().astype(str)
+    rows = pd.concat([rows, build_partials(df1, pd.Series({country: ids[country] for country in present}, dtype=object))]).sort_index()
+  return rows
+
+def country_partials():
+  return derived('country_partials', lambda: parallel_partials(load_data(columns=PARTIAL_COLUMNS)),
+                 update=update_partials)
+
+def select(partials, countries):
+  # Linhas dos países selecionados, na mesma ordem alfabética de um groupby sobre a base filtrada.
+  return partials.loc[partials.index.isin(countries), :]
+
+def merge(partials, countries):
+  # Junta os parciais dos países selecionados nos totais da página inicial.
+  rows = select(partials, countries)
+  return {
+    'Restaurants': len(frozenset().union(*rows['Restaurant IDs'])),
+    'Countries': len(frozenset().union(*rows['Country Codes'])),
+    'Cities': len(frozenset().union(*rows['Cities'])),
+    'Votes': rows['Votes sum'].sum(),
+    'Cuisines': len(frozenset().union(*rows['Cuisines'])),
+  }
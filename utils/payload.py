@@ -0,0 +1,67 @@
+import os
+
+from utils import metrics
+from utils.figures import CHARTS, MAP_HEIGHT, MAP_WIDTH, chart, map_figure, map_html
+from utils.mapping import view_bbox
+
+# Orçamento do que cada reexecução envia ao navegador. Cada gráfico tem no máximo CHART_BARS barras
+# (utils/figures.py) e cada tabela, no máximo TABLE_ROWS linhas por página; as demais páginas da
+# tabela são escolhidas no servidor, sem enviar a tabela inteira. Os valores padrão ficam acima do
+# que as páginas mostram hoje.
+# O mapa só recebe os restaurantes da área visível (e em volta dela): quando o usuário move o mapa
+# para outra área, a página é reexecutada e o mapa, refeito nela.
+# Com a instrumentação ligada (utils/metrics.py), os bytes de cada elemento são registrados.
+# Entre reexecuções, um elemento igual ao anterior é enviado só como referência pelo cache de
+# mensagens do Streamlit (global.minCachedMessageSize em .streamlit/config.toml).
+TABLE_ROWS = int(os.environ.get('RESTAURANTS_TABLE_ROWS', 50))
+
+def frame_bytes(df):
+  # Tamanho da tabela em Arrow IPC, o formato em que o Streamlit a envia.
+  import pyarrow as pa
+  table = pa.Table.from_pandas(df)
+  sink = pa.BufferOutputStream()
+  with pa.ipc.new_stream(sink, table.schema) as writer:
+    writer.write_table(table)
+  return sink.getvalue().size
+
+def plotly_chart(func, df, **selection):
+  # st.plotly_chart do gráfico da agregação func (utils/figures.py), registrado com o seu título.
+  import streamlit as st
+  fig = chart(func, df, **selection)
+  st.plotly_chart(fig, use_container_width=True)
+  if metrics.ENABLED:
+    metrics.sent('chart.' + CHARTS[func]['title'], len(fig.to_json()))
+
+def dataframe(df, key):
+  # st.dataframe paginado no servidor: acima de TABLE_ROWS linhas, só a página escolhida é enviada.
+  import streamlit as st
+  if len(df) > TABLE_ROWS:
+    pages = (len(df) - 1) // TABLE_ROWS + 1
+    page = st.number_input('Page', min_value=1, max_value=pages, value=1, step=1, key=key)
+    start = (page - 1) * TABLE_ROWS
+    st.caption('Rows {} to {} of {}'.format(start + 1, min(start + TABLE_ROWS, len(df)), len(df)))
+    df = df.iloc[start:start + TABLE_ROWS]
+  st.dataframe(df)
+  if metrics.ENABLED:
+    metrics.sent('table.' + key, frame_bytes(df))
+
+def folium_map(df, countries, key='map_view'):
+  # Mapa dos restaurantes dos países selecionados, pelo st_folium, que informa a área visível a cada
+  # movimento. Retorna o número de restaurantes no mapa.
+  import streamlit as st
+  from streamlit_folium import st_folium
+  view = st.session_state.get(key)
+  map, restaurants = map_figure(df, countries, view)
+  returned = st_folium(map, height=MAP_HEIGHT, width=MAP_WIDTH, returned_objects=['bounds', 'center', 'zoom'])
+  if metrics.ENABLED:
+    metrics.sent('map', len(map_html(map)))
+  # Antes da primeira resposta do navegador, o st_folium devolve valores padrão, sem o centro.
+  # A vista salva só muda quando a área arredondada muda: dentro da mesma área, o mapa é refeito com
+  # o mesmo centro, zoom e restaurantes, e o st_folium não o remonta nem o envia de novo. Só numa área
+  # nova a vista é salva e a página, reexecutada com o mapa dessa área.
+  if returned and returned.get('center'):
+    if view_bbox(returned.get('bounds')) != view_bbox((view or {}).get('bounds')):
+      st.session_state[key] = returned
+      rerun = getattr(st, 'rerun', None) or st.experimental_rerun
+      rerun()
+  return restaurants
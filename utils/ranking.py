@@ -0,0 +1,35 @@
+import numpy as np
+
+# Seleção dos k primeiros de um ranking sem ordenar a base inteira: np.partition encontra a k-ésima
+# maior nota em tempo linear, e só os candidatos com nota maior ou igual a ela (os k primeiros mais
+# eventuais empates) são ordenados. O resultado é o mesmo de
+#   sort_values([nota, desempate], ascending=[False, True]).head(k)
+# inclusive na ordem dos empates e com notas vazias (NaN) no final.
+
+def rank(scores, ties, rows):
+  # Ordena as posições rows por nota decrescente e desempate crescente, de forma estável.
+  return rows[np.lexsort((ties[rows], -scores[rows]))]
+
+def top_k_positions(scores, ties, k):
+  scores = np.asarray(scores, dtype=float)
+  ties = np.asarray(ties)
+  if k <= 0:
+    return np.empty(0, dtype=np.intp)
+  valid = np.flatnonzero(~np.isnan(scores))
+  if k >= len(valid):
+    # Todas as notas válidas entram; as vazias completam o ranking ordenadas pelo desempate.
+    missing = np.flatnonzero(np.isnan(scores))
+    missing = missing[np.argsort(ties[missing], kind='stable')]
+    return np.concatenate([rank(scores, ties, valid), missing])[:k]
+
+  threshold = np.partition(scores[valid], len(valid) - k)[len(valid) - k]
+  candidates = valid[scores[valid] >= threshold]
+  return rank(scores, ties, candidates)[:k]
+
+def top_k(df, k, score='Aggregate rating', tie='Restaurant ID', columns=None):
+  # As k primeiras linhas de df pelo ranking, mantendo como índice a posição de cada linha em df.
+  positions = top_k_positions(df[score].to_numpy(dtype=float), df[tie].to_numpy(), k)
+  columns = list(columns) if columns is not None else list(df.columns)
+  result = df.iloc[positions].loc[:, columns]
+  result.index = positions
+  return result
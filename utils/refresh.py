@@ -0,0 +1,61 @@
+import logging
+import os
+import threading
+import time
+
+from utils import loader
+from utils.metrics import count
+from utils.warmup import warm
+
+# Atualização dos dados em segundo plano: uma thread confere a cada INTERVAL segundos se o CSV (ou o
+# snapshot), os deltas ou a tabela de cotações mudaram. Quando mudam, ela lê, limpa e aplica os
+# deltas, refaz as projeções e estruturas derivadas e aquece o cache das seleções padrão e populares
+# (utils/warmup.py) numa geração nova (utils/loader.py), e só então a publica. Enquanto isso as
+# páginas continuam recebendo a versão anterior, completa, sem esperar. Só uma reconstrução roda por
+# vez, qualquer que seja o número de sessões. Com RESTAURANTS_REFRESH_SECONDS=0 a thread não é
+# iniciada e as páginas voltam a conferir os arquivos a cada execução, como antes.
+INTERVAL = float(os.environ.get('RESTAURANTS_REFRESH_SECONDS', 5))
+
+logger = logging.getLogger(__name__)
+
+_rebuild = threading.Lock()
+_lock = threading.Lock()
+_started = False
+
+def refresh(path=loader.DATA_PATH):
+  # Publica a versão atual dos arquivos de path, se ainda não for a publicada, e a retorna (None se
+  # nada mudou). Na primeira chamada a versão atual só é fixada: os dados são carregados e aquecidos
+  # pelas páginas e pelo pré-aquecimento, como sem o atualizador.
+  with _rebuild:
+    version = loader.live_version(path)
+    published = loader.published_version(path)
+    if version == published:
+      return None
+    if published is None:
+      loader.publish(path, version)
+      return version
+
+    start = time.perf_counter()
+    version = loader.rebuild(path, prepare=warm)
+    count('refreshes_total')
+    logger.info('Published data version %s of %s in %.1fs', version[:12], path, time.perf_counter() - start)
+    return version
+
+def run(path):
+  while True:
+    try:
+      refresh(path)
+    except Exception:
+      # Arquivo incompleto (ainda sendo copiado), delta inválido...: a versão anterior continua
+      # publicada e a próxima conferência tenta de novo.
+      logger.exception('Background refresh of %s failed', path)
+    time.sleep(INTERVAL)
+
+def watch(path=loader.DATA_PATH):
+  # Inicia o atualizador, uma única vez por processo.
+  global _started
+  with _lock:
+    if _started or not INTERVAL:
+      return
+    _started = True
+  threading.Thread(target=run, args=(path,), name='refresh', daemon=True).start()
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from utils import parallel
+from utils.loader import derived, load_data
+
+# Tabela de cidades (rollup) da visão por cidade, calculada uma única vez por versão dos dados: uma
+# linha por (país, cidade) com o total de restaurantes, as faixas de nota usadas nos gráficos e o
+# número de culinárias distintas. Cada gráfico da página passa a filtrar alguns milhares de linhas
+# desta tabela em vez de agrupar a base de restaurantes inteira.
+ROLLUP_COLUMNS = ['Restaurant ID', 'Country Name', 'City', 'Aggregate rating', 'Cuisines']
+KEYS = ['Country Name', 'City']
+
+def build_rollup(df):
+  # Um único groupby sobre a base. Os contadores contam só linhas com Restaurant ID, como o count()
+  # das agregações originais, e ficam em 32 bits.
+  has_id = df['Restaurant ID'].notna()
+  rating = df['Aggregate rating']
+  df1 = pd.DataFrame({
+    'Country Name': df['Country Name'],
+    'City': df['City'],
+    'Cuisines': df['Cuisines'],
+    'Restaurants': has_id,
+    'Over 4': has_id & (rating >= 4),
+    'Under 2.5': has_id & (rating < 2.5),
+  })
+  rollup = df1.groupby(KEYS, observed=True).agg(**{
+    'Restaurants': ('Restaurants', 'sum'),
+    'Over 4': ('Over 4', 'sum'),
+    'Under 2.5': ('Under 2.5', 'sum'),
+    'Cuisines': ('Cuisines', 'nunique'),
+  })
+  return rollup.astype(np.int32).sort_index()
+
+def parallel_rollup(df):
+  # As linhas de um país dependem só dos restaurantes dele (ver utils/parallel.py).
+  if not parallel.enabled(df):
+    return build_rollup(df)
+  parts = parallel.partitions(df, 'Country Name', parallel.WORKERS)
+  return pd.concat(parallel.map_partitions(build_rollup, df, parts)).sort_index()
+
+def update_rollup(rollup, change):
+  # Depois de um delta, recalcula apenas as cidades dos países afetados. Os níveis do índice passam
+  # a usar as categorias atuais da base, para manter a mesma ordem de um groupby sobre ela.
+  countries = change['countries']
+  df1 = load_data(columns=ROLLUP_COLUMNS)
+  rows = rollup.loc[~rollup.index.get_level_values('Country Name').isin(countries), :]
+  rows = pd.concat([rows, build_rollup(df1.loc[df1['Country Name'].isin(countries), :])])
+  rows.index = pd.MultiIndex.from_arrays(
+    [pd.Categorical(rows.index.get_level_values(key), categories=df1[key].cat.categories) for key in KEYS],
+    names=KEYS)
+  return rows.sort_index()
+
+def city_rollup():
+  return derived('city_rollup', lambda: parallel_rollup(load_data(columns=ROLLUP_COLUMNS)), update=update_rollup)
+
+def city_counts(rollup, countries, column, name, keep_zero=True):
+  # A contagem column das cidades dos países selecionados com o nome name, na mesma ordem e com o
+  # mesmo tipo de um groupby(['Country Name', 'City']).count() sobre a base filtrada. Sem keep_zero,
+  # as cidades sem nenhuma linha contada ficam de fora, como num groupby feito depois do filtro.
+  values = rollup.loc[rollup.index.get_level_values('Country Name').isin(countries), column]
+  if not keep_zero:
+    values = values[values > 0]
+  return values.astype(np.int64).to_frame(name)
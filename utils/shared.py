@@ -0,0 +1,124 @@
+import contextlib
+import glob
+import logging
+import os
+import sys
+
+import pandas as pd
+
+# Modo compartilhado, para vários processos do Streamlit na mesma máquina: com RESTAURANTS_SHARED_DIR
+# definido (ex.: /dev/shm/restaurants), o data frame limpo de cada versão dos dados é gravado uma
+# única vez nessa pasta (a arena), em Arrow sem compressão e num único bloco, e todos os processos o
+# mapeiam em memória. As colunas numéricas e os códigos das categóricas viram arrays que apontam
+# direto para o arquivo mapeado, sem cópia, então a memória da máquina quase não cresce com o número
+# de processos e um processo novo começa sem ler nem limpar o CSV. Só as colunas de texto livre
+# (Restaurant Name) e as com valores vazios são copiadas para cada processo.
+# O primeiro processo que precisa de uma versão ainda sem arena a constrói (os demais esperam por
+# ela); python -m utils.shared publica a versão atual antes de iniciar os processos.
+SHARED_DIR = os.environ.get('RESTAURANTS_SHARED_DIR')
+
+# Arenas mantidas na pasta: a atual e a anterior, que pode estar em uso por um processo que ainda não
+# trocou de versão.
+KEEP = 2
+
+# O pyarrow é instalado junto com o streamlit; o fcntl (trava entre processos) só existe no Unix.
+try:
+  import pyarrow as pa
+  import pyarrow.feather as feather
+except ImportError:
+  pa = feather = None
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def enabled():
+  return bool(SHARED_DIR) and feather is not None
+
+def arena_path(path, version):
+  name = os.path.splitext(os.path.basename(path))[0]
+  return os.path.join(SHARED_DIR, '{}-{}.arrow'.format(name, version))
+
+@contextlib.contextmanager
+def exclusive(path):
+  # Só um processo da máquina constrói as arenas de path de cada vez.
+  if fcntl is None:
+    yield
+    return
+  name = os.path.splitext(os.path.basename(path))[0]
+  with open(os.path.join(SHARED_DIR, '.{}.lock'.format(name)), 'w') as f:
+    fcntl.flock(f, fcntl.LOCK_EX)
+    try:
+      yield
+    finally:
+      fcntl.flock(f, fcntl.LOCK_UN)
+
+def write(df, arena):
+  # Grava o data frame num único bloco (cada coluna contígua no arquivo), sem compressão.
+  tmp_path = arena + '.tmp'
+  feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed',
+                        chunksize=max(len(df), 1))
+  os.replace(tmp_path, arena)
+
+def cleanup(path):
+  # Remove as arenas antigas de path. Um processo que ainda mapeia uma delas continua lendo
+  # normalmente (no Unix, o arquivo só deixa de existir quando ninguém mais o usa).
+  name = os.path.splitext(os.path.basename(path))[0]
+  arenas = sorted(glob.glob(os.path.join(SHARED_DIR, name + '-*.arrow')), key=os.path.getmtime)
+  for arena in arenas[:-KEEP]:
+    try:
+      os.remove(arena)
+    except OSError:
+      pass
+
+def column_values(column):
+  # Valores da coluna para o pandas, apontando para o arquivo mapeado quando possível.
+  if column.num_chunks == 1 and column.null_count == 0:
+    chunk = column.chunk(0)
+    if pa.types.is_integer(chunk.type) or pa.types.is_floating(chunk.type):
+      return chunk.to_numpy(zero_copy_only=True)
+    if pa.types.is_dictionary(chunk.type):
+      return pd.Categorical.from_codes(chunk.indices.to_numpy(zero_copy_only=True),
+                                       categories=chunk.dictionary.to_pandas())
+  return column.to_pandas().to_numpy()
+
+def attach(arena):
+  # Data frame somente leitura sobre a arena. O copy=False mantém uma coluna por bloco, sem juntar
+  # (e copiar) as colunas do mesmo tipo.
+  table = feather.read_table(arena, memory_map=True)
+  return pd.DataFrame({name: column_values(column) for name, column in zip(table.column_names, table.columns)},
+                      copy=False)
+
+def select(df, columns):
+  # Projeção que compartilha as colunas do data frame (df.loc[:, columns] copiaria as da arena).
+  return pd.DataFrame({column: df[column] for column in columns}, copy=False)
+
+def load(path, version, build):
+  # Data frame da versão version de path, mapeado da arena. Se ela ainda não existe, build() o
+  # constrói e a arena é gravada, por um único processo de cada vez.
+  os.makedirs(SHARED_DIR, exist_ok=True)
+  arena = arena_path(path, version)
+  if not os.path.exists(arena):
+    with exclusive(path):
+      if not os.path.exists(arena):
+        write(build(), arena)
+        logger.info('Published %s (%d bytes)', arena, os.path.getsize(arena))
+        cleanup(path)
+  return attach(arena)
+
+if __name__ == '__main__':
+  # Uso: RESTAURANTS_SHARED_DIR=/dev/shm/restaurants python -m utils.shared [zomato.csv]
+  # Publica a arena da versão atual, para que os processos do Streamlit já a encontrem pronta.
+  from utils.loader import DATA_PATH, data_version, load_store
+  if not enabled():
+    sys.exit('Set RESTAURANTS_SHARED_DIR to the arena directory (pyarrow is required)')
+  logging.basicConfig(level=logging.INFO)
+  csv_path = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+  df1 = load_store(csv_path)
+  arena = arena_path(csv_path, data_version(csv_path))
+  print(arena)
+  print({'rows': len(df1), 'bytes': os.path.getsize(arena), 'columns': len(df1.columns),
+         'copied_columns': [column for column in df1.columns if df1[column].dtype == object]})
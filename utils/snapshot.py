@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pandas as pd
+
+from utils.parallel import parallel_clean
+from utils.streaming import write_snapshot
+
+# O pyarrow é instalado junto com o streamlit, mas o snapshot é opcional: sem ele as páginas
+# continuam lendo o CSV.
+try:
+  import pyarrow.feather as feather
+except ImportError:
+  feather = None
+
+def snapshot_path(csv_path):
+  # O snapshot fica ao lado do CSV, com o mesmo nome e extensão .feather.
+  return os.path.splitext(csv_path)[0] + '.feather'
+
+def has_snapshot(csv_path):
+  # O snapshot só é usado se existir e não for mais antigo que o CSV de origem; caso contrário as
+  # páginas voltam a ler o CSV.
+  if feather is None:
+    return False
+  path = snapshot_path(csv_path)
+  if not os.path.exists(path):
+    return False
+  if not os.path.exists(csv_path):
+    return True
+  return os.path.getmtime(path) >= os.path.getmtime(csv_path)
+
+def build_snapshot(csv_path, path=None, drop_unused=True, chunk_rows=None):
+  # Lê e limpa o CSV e grava o resultado compactado (utils/compact.py) em formato colunar binário
+  # (Feather/Arrow). Retorna o caminho do snapshot e o relatório de memória.
+  # A gravação é feita sem compressão para que a leitura possa mapear o arquivo em memória sem
+  # copiar as colunas numéricas. Com chunk_rows, o CSV é lido e gravado em blocos desse tamanho
+  # (utils/streaming.py), sem nunca estar inteiro na memória.
+  if feather is None:
+    raise ImportError('pyarrow is required to build the snapshot')
+  path = path or snapshot_path(csv_path)
+  if chunk_rows:
+    return path, write_snapshot(csv_path, path, drop_unused=drop_unused, chunk_rows=chunk_rows)
+  df1, report = parallel_clean(pd.read_csv(csv_path), drop_unused=drop_unused)
+  tmp_path = path + '.tmp'
+  feather.write_feather(df1, tmp_path, compression='uncompressed')
+  os.replace(tmp_path, path)
+  return path, report
+
+def read_snapshot(path, columns=None):
+  # Mapeia o arquivo em memória e converte apenas as colunas pedidas.
+  table = feather.read_table(path, columns=columns, memory_map=True)
+  return table.to_pandas(split_blocks=True)
+
+if __name__ == '__main__':
+  # Uso: python -m utils.snapshot [--keep-unused] [--chunk-rows=500000] [zomato.csv] [zomato.feather]
+  args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+  chunk_rows = [int(arg.split('=', 1)[1]) for arg in sys.argv[1:] if arg.startswith('--chunk-rows=')]
+  csv_path = args[0] if len(args) > 0 else 'zomato.csv'
+  path = args[1] if len(args) > 1 else None
+  path, report = build_snapshot(csv_path, path, drop_unused='--keep-unused' not in sys.argv,
+                                chunk_rows=chunk_rows[-1] if chunk_rows else None)
+  print(path)
+  print(report)
@@ -0,0 +1,151 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from utils.cleaning import clear_data
+from utils.compact import CATEGORY_COLUMNS, UNUSED_COLUMNS, memory_usage
+
+try:
+  import pyarrow as pa
+  import pyarrow.feather as feather
+except ImportError:
+  pa = feather = None
+
+# Construção do snapshot em modo streaming, para CSVs maiores que a memória: o arquivo é lido em
+# blocos de CHUNK_ROWS linhas, cada bloco passa pelas mesmas regras do clear_data e as linhas
+# repetidas são descartadas entre blocos por uma impressão digital (hash) de cada linha. O pico de
+# memória depende do tamanho do bloco, mais 8 bytes por linha distinta para as impressões digitais.
+#
+# São duas passadas: a primeira limpa os blocos, grava cada um em um arquivo temporário e acumula
+# o que a compactação precisa saber da base inteira (os valores de cada categoria, os limites dos
+# inteiros, se os floats cabem em 32 bits); a segunda converte os blocos para os mesmos tipos que
+# utils/compact.py daria à base inteira e os grava, um por vez, no snapshot.
+CHUNK_ROWS = 500_000
+
+INTEGER_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+def fingerprints(chunk):
+  # Hash de cada linha original. Os números são comparados como float64, pois o read_csv pode inferir
+  # tipos diferentes para a mesma coluna em blocos diferentes (inteiro em um, float com nulos em
+  # outro). Colisões de 64 bits são desprezíveis para dezenas de milhões de linhas.
+  values = chunk.copy()
+  for column in values.columns:
+    if values[column].dtype.kind in 'iufb' or values[column].isna().all():
+      values[column] = values[column].astype(np.float64)
+  return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+def contains(levels, values):
+  found = np.zeros(len(values), dtype=bool)
+  for level in levels:
+    positions = np.minimum(np.searchsorted(level, values), len(level) - 1)
+    found |= level[positions] == values
+  return found
+
+def remember(levels, values):
+  # As impressões digitais ficam em arrays ordenados de tamanhos decrescentes; dois níveis de tamanho
+  # parecido são juntados, então há no máximo log2(linhas) níveis para consultar.
+  if not len(values):
+    return
+  levels.append(np.sort(values))
+  while len(levels) > 1 and len(levels[-2]) <= 2 * len(levels[-1]):
+    last = levels.pop()
+    levels[-1] = np.sort(np.concatenate([levels[-1], last]))
+
+def clean_chunks(csv_path, chunk_rows=CHUNK_ROWS):
+  # Blocos limpos, sem as linhas que já apareceram antes (no mesmo bloco ou em blocos anteriores),
+  # na ordem do arquivo, como o drop_duplicates do clear_data, junto com o número de linhas
+  # descartadas em cada bloco. Um bloco só com linhas repetidas vem como None.
+  levels = []
+  for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+    hashes = fingerprints(chunk)
+    keep = ~(pd.Series(hashes).duplicated().to_numpy() | contains(levels, hashes))
+    remember(levels, hashes[keep])
+    yield clear_data(chunk.loc[keep]) if keep.any() else None, int((~keep).sum())
+
+def collect(stats, df):
+  # Acumula, coluna a coluna, o que a compactação da base inteira precisa.
+  for column in df.columns:
+    values = df[column]
+    entry = stats.setdefault(column, {'kinds': set(), 'categories': set(), 'min': None, 'max': None,
+                                      'float32': True})
+    entry['kinds'].add(values.dtype.kind)
+    if column in CATEGORY_COLUMNS:
+      entry['categories'].update(values.dropna().unique())
+      continue
+    if values.dtype.kind in 'iu' and len(values):
+      entry['min'] = min(values.min(), entry['min']) if entry['min'] is not None else values.min()
+      entry['max'] = max(values.max(), entry['max']) if entry['max'] is not None else values.max()
+    if values.dtype.kind in 'iuf':
+      array = values.to_numpy(dtype=np.float64)
+      entry['float32'] &= np.array_equal(array.astype(np.float32).astype(np.float64), array, equal_nan=True)
+
+def dictionary_bytes(df):
+  # Memória dos dicionários das categorias, que se repetem em todos os blocos.
+  return sum(int(df[column].cat.categories.memory_usage(deep=True))
+             for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype))
+
+def target_types(stats):
+  # Tipo final de cada coluna: o mesmo que to_categories e downcast (utils/compact.py) escolheriam
+  # olhando a base inteira.
+  types = {}
+  for column, entry in stats.items():
+    kinds = entry['kinds']
+    if column in CATEGORY_COLUMNS:
+      types[column] = pd.CategoricalDtype(sorted(entry['categories']))
+    elif kinds <= {'i', 'u'}:
+      low, high = entry['min'] or 0, entry['max'] or 0
+      types[column] = next(dtype for dtype in INTEGER_TYPES
+                           if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max)
+    elif kinds <= {'i', 'u', 'f'}:
+      types[column] = np.float32 if entry['float32'] else np.float64
+    elif kinds == {'b'}:
+      types[column] = np.bool_
+    else:
+      types[column] = object
+  return types
+
+def write_snapshot(csv_path, path, drop_unused=True, chunk_rows=CHUNK_ROWS):
+  # Grava em path o mesmo snapshot que utils/snapshot.py gravaria lendo o CSV inteiro. Retorna o
+  # relatório de memória, somado bloco a bloco.
+  stats = {}
+  report = {'rows': 0, 'bytes_before': 0, 'bytes_after': 0, 'duplicates': 0, 'chunks': 0}
+  with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as workdir:
+    files = []
+    for df1, duplicates in clean_chunks(csv_path, chunk_rows):
+      report['duplicates'] += duplicates
+      if df1 is None:
+        continue
+      report['bytes_before'] += memory_usage(df1)
+      if drop_unused:
+        df1 = df1.drop(columns=[column for column in UNUSED_COLUMNS if column in df1.columns])
+      collect(stats, df1)
+      files.append(os.path.join(workdir, '{:06d}.feather'.format(len(files))))
+      feather.write_feather(df1, files[-1], compression='uncompressed')
+
+    types = target_types(stats)
+    writer = None
+    tmp_path = path + '.tmp'
+    try:
+      for file in files:
+        df1 = feather.read_feather(file)
+        df1 = df1.astype({column: dtype for column, dtype in types.items() if column in df1.columns})
+        table = pa.Table.from_pandas(df1, preserve_index=False)
+        if writer is None:
+          writer = pa.ipc.new_file(tmp_path, table.schema)
+        writer.write_table(table)
+        report['rows'] += len(df1)
+        report['bytes_after'] += memory_usage(df1) - (dictionary_bytes(df1) if report['chunks'] else 0)
+        report['chunks'] += 1
+        os.remove(file)
+    finally:
+      if writer is not None:
+        writer.close()
+  if writer is None:
+    raise ValueError('{} has no rows'.format(csv_path))
+  os.replace(tmp_path, path)
+
+  report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+  report['ratio'] = round(report['bytes_before'] / report['bytes_after'], 2) if report['bytes_after'] else None
+  return report
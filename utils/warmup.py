@@ -0,0 +1,148 @@
+from collections import Counter, deque
+import json
+import logging
+import os
+import threading
+import time
+
+from utils.aggregations import (aggregate, best_cuisines, best_restaurants, cities_by_country, cuisine_options,
+                                home_metrics, price_by_country, restaurants_by_country, top_cities,
+                                top_cities_cuisines, top_cities_over_4, top_cities_under_2_5, votes_by_country,
+                                worst_cuisines)
+from utils.cache import normalize
+from utils.figures import chart, map_data
+from utils.loader import load_data, pin, unpin
+
+# Pré-aquecimento: as seleções padrão das páginas e as mais usadas recentemente têm as agregações,
+# os gráficos e o mapa calculados numa thread em segundo plano assim que o processo começa a servir
+# (o Streamlit não tem um gancho de início do servidor; start() é chamado pelas páginas e só dispara
+# a thread uma vez por processo). A primeira visita com a seleção padrão encontra tudo no cache.
+#
+# As seleções de cada página são registradas por record() e as RECENT mais recentes ficam salvas em
+# POPULAR_FILE, para que o próximo processo aqueça as POPULAR mais frequentes de cada página.
+WARMUP = os.environ.get('RESTAURANTS_WARMUP', '1').lower() not in ('', '0', 'false', 'no')
+POPULAR_FILE = os.environ.get('RESTAURANTS_POPULAR_FILE', 'popular_selections.json')
+RECENT = 1000
+POPULAR = 5
+SAVE_EVERY = 20
+
+# Colunas e seleções padrão de cada página.
+HOME_COLUMNS = ['Restaurant ID', 'Restaurant Name', 'Country Name', 'City', 'Latitude', 'Longitude',
+                'Cuisines', 'Average Cost for two', 'Currency', 'Aggregate rating', 'Rating color']
+COUNTRY_COLUMNS = ['Restaurant ID', 'Country Name', 'City', 'Votes', 'Price in Dollar for two']
+CITY_COLUMNS = ['Restaurant ID', 'Country Name', 'City', 'Aggregate rating', 'Cuisines']
+CUISINE_COLUMNS = ['Restaurant ID', 'Restaurant Name', 'Country Name', 'City', 'Cuisines',
+                   'All Cuisines', 'Aggregate rating', 'Price in Dollar for two', 'Votes']
+
+COUNTRIES = ['Australia', 'Brazil', 'Canada', 'England', 'India', 'Indonesia', 'New Zeland',
+             'Philippines', 'Qatar', 'Singapure', 'South Africa', 'Sri Lanka', 'Turkey',
+             'United Arab Emirates', 'United States of America']
+HOME_COUNTRIES = ['Brazil', 'England', 'Turkey']
+DEFAULT_COUNTRIES = ['Brazil', 'England', 'India', 'Turkey', 'United States of America']
+DEFAULT_CUISINES = ['Brazilian', 'BBQ', 'Italian', 'Japanese']
+DEFAULT_TOP = 10
+
+logger = logging.getLogger(__name__)
+
+_recent = deque(maxlen=RECENT)
+_lock = threading.Lock()
+_started = False
+_unsaved = 0
+
+# O que cada página calcula para uma seleção, com as mesmas chamadas da página.
+
+def warm_home(countries):
+  df1 = load_data(columns=HOME_COLUMNS)
+  aggregate(home_metrics, df1, countries=countries)
+  map_data(df1, countries)
+
+def warm_countries(countries):
+  df1 = load_data(columns=COUNTRY_COLUMNS)
+  for func in (restaurants_by_country, cities_by_country, votes_by_country, price_by_country):
+    chart(func, df1, countries=countries)
+
+def warm_cities(countries):
+  df1 = load_data(columns=CITY_COLUMNS)
+  for func in (top_cities, top_cities_over_4, top_cities_under_2_5, top_cities_cuisines):
+    chart(func, df1, countries=countries, top=10)
+
+def warm_cuisines(countries, cuisines, listed=False, top=DEFAULT_TOP):
+  df1 = load_data(columns=CUISINE_COLUMNS)
+  options = aggregate(cuisine_options, df1, countries=countries, listed=listed)
+  cuisines = [cuisine for cuisine in cuisines if cuisine in options]
+  aggregate(best_restaurants, df1, countries=countries, cuisines=cuisines, listed=listed, top=5)
+  aggregate(best_restaurants, df1, countries=countries, cuisines=cuisines, listed=listed, top=top)
+  for func in (best_cuisines, worst_cuisines):
+    chart(func, df1, countries=countries, cuisines=cuisines, listed=listed, top=10)
+
+PAGES = {
+  'home': (warm_home, dict(countries=HOME_COUNTRIES)),
+  'countries': (warm_countries, dict(countries=DEFAULT_COUNTRIES)),
+  'cities': (warm_cities, dict(countries=DEFAULT_COUNTRIES)),
+  'cuisines': (warm_cuisines, dict(countries=DEFAULT_COUNTRIES, cuisines=DEFAULT_CUISINES, listed=False, top=DEFAULT_TOP)),
+}
+
+def record(page, **selection):
+  # Registra a seleção usada em uma execução da página.
+  global _unsaved
+  with _lock:
+    _recent.append((page, tuple(sorted((name, normalize(value)) for name, value in selection.items()))))
+    _unsaved += 1
+    if _unsaved < SAVE_EVERY:
+      return
+    _unsaved = 0
+    recent = list(_recent)
+  save(recent)
+
+def save(recent, path=None):
+  path = path or POPULAR_FILE
+  try:
+    with open(path + '.tmp', 'w') as file:
+      json.dump([[page, [[name, value] for name, value in selection]] for page, selection in recent], file)
+    os.replace(path + '.tmp', path)
+  except OSError as error:
+    logger.warning('Could not save popular selections: %s', error)
+
+def load(path=None):
+  # Seleções recentes salvas por um processo anterior.
+  path = path or POPULAR_FILE
+  try:
+    with open(path) as file:
+      saved = json.load(file)
+  except (OSError, ValueError):
+    return []
+  return [(page, tuple((name, normalize(value)) for name, value in selection)) for page, selection in saved]
+
+def popular(page, top=POPULAR):
+  # As top seleções mais frequentes da página entre as recentes.
+  with _lock:
+    counts = Counter(selection for name, selection in _recent if name == page)
+  return [dict(selection) for selection, _ in counts.most_common(top)]
+
+def warm(pages=None, top=POPULAR):
+  # Calcula as seleções padrão e as populares de cada página. Uma seleção que falha (um país que
+  # saiu da base, por exemplo) não interrompe as demais.
+  start = time.perf_counter()
+  done = 0
+  for page in pages or PAGES:
+    func, defaults = PAGES[page]
+    for selection in [defaults] + popular(page, top):
+      try:
+        pin()
+        func(**selection)
+        done += 1
+      except Exception:
+        logger.exception('Warm-up failed for %s %s', page, selection)
+  unpin()
+  logger.info('Warm-up: %d selections in %.1fs', done, time.perf_counter() - start)
+  return done
+
+def start():
+  # Inicia o pré-aquecimento em segundo plano, uma única vez por processo.
+  global _started
+  with _lock:
+    if _started or not WARMUP:
+      return
+    _started = True
+    _recent.extend(load())
+  threading.Thread(target=warm, name='warmup', daemon=True).start()